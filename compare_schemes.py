@@ -0,0 +1,51 @@
+# compare_schemes.py
+# Compares the CKKS and BFV backends on the same embeddings: encrypted
+# compute throughput, serialized ciphertext size per word, and how closely
+# each ranking agrees with the plaintext cosine similarities.
+
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from vector_database.benchmark import compare_schemes
+from vector_database.data_loader import load_word_embeddings
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = 'data'
+
+
+def main():
+    # Start timer
+    start_time = time.time()
+
+    # Load embeddings
+    print("Loading embeddings...")
+    embeddings_path = os.path.join(script_dir, data_dir, 'word_embeddings.txt')
+    embeddings = load_word_embeddings(embeddings_path)
+    query_word = 'king'
+    k = 5
+
+    # Run both backends
+    print("Benchmarking CKKS and BFV...")
+    reports = compare_schemes(embeddings, query_word, k=k)
+
+    # Display the comparison
+    print("\nComparison:")
+    for report in reports:
+        print(f"Scheme: {report['scheme'].upper()} (poly_modulus_degree={report['poly_modulus_degree']})")
+        print(f"  Encryption time: {report['encrypt_seconds']:.2f} seconds")
+        print(f"  Compute time: {report['compute_seconds']:.2f} seconds ({report['words_per_second']:.2f} words/second)")
+        print(f"  Ciphertext size: {report['bytes_per_word'] / 1024:.1f} KiB per word")
+        print(f"  Top-{k} overlap with plaintext: {report['agreement']['top_k_overlap']:.2f}")
+        print(f"  Spearman rank correlation with plaintext: {report['agreement']['spearman']:.4f}\n")
+
+    # End timer
+    end_time = time.time()
+    print(f"Comparison completed in {end_time - start_time:.2f} seconds.")
+
+
+if __name__ == '__main__':
+    main()
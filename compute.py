@@ -16,6 +16,7 @@ data_dir = 'data'
 
 from vector_database.computation import (
     load_encrypted_embeddings,
+    load_encrypted_store_header,
     load_encrypted_query,
     compute_encrypted_cosine_similarities,
     save_encrypted_results,
@@ -31,8 +32,10 @@ def main():
 
     # Load encrypted embeddings
     print("Loading encrypted embeddings...")
+    encrypted_data_path = os.path.join(script_dir, data_dir, 'encrypted_vectors.bin')
+    store_header = load_encrypted_store_header(encrypted_data_path)
     encrypted_embeddings, context = load_encrypted_embeddings(
-        encrypted_data_path=os.path.join(script_dir, data_dir, 'encrypted_vectors.bin'),
+        encrypted_data_path=encrypted_data_path,
         context_public_path=os.path.join(script_dir, data_dir, 'context_public.bin')
     )
 
@@ -55,7 +58,9 @@ def main():
     print("Saving encrypted results...")
     save_encrypted_results(
         encrypted_results,
-        results_path=os.path.join(script_dir, data_dir, 'encrypted_results.bin')
+        results_path=os.path.join(script_dir, data_dir, 'encrypted_results.bin'),
+        vocabulary_fingerprint=store_header['vocabulary_fingerprint'],
+        store_fingerprint=store_header['store_fingerprint']
     )
 
     # End timer
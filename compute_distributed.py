@@ -0,0 +1,70 @@
+# compute_distributed.py
+# Sharded variant of compute.py: the encrypted store is split across worker
+# processes, each holding its shard and the public context. The coordinator
+# fans the encrypted query out to every shard and merges the (still encrypted)
+# results into the same results file that display_results.py decrypts.
+
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = 'data'
+
+from vector_database.computation import load_encrypted_store_header
+from vector_database.sharding import (
+    start_local_workers,
+    distribute_encrypted_embeddings,
+    scatter_gather_query,
+    stop_workers,
+    join_workers,
+)
+import time
+
+
+def main():
+    # Step 2 (sharded): Computation
+    num_workers = 4
+
+    # Start timer
+    start_time = time.time()
+
+    # Start local workers
+    print(f"Starting {num_workers} local workers...")
+    processes, worker_addresses = start_local_workers(num_workers)
+
+    try:
+        # Distribute the encrypted store across the workers
+        print("Distributing encrypted embeddings...")
+        encrypted_data_path = os.path.join(script_dir, data_dir, 'encrypted_vectors.bin')
+        store_header = load_encrypted_store_header(encrypted_data_path)
+        shard_sizes = distribute_encrypted_embeddings(
+            worker_addresses,
+            encrypted_data_path=encrypted_data_path,
+            context_public_path=os.path.join(script_dir, data_dir, 'context_public.bin')
+        )
+        for address, size in shard_sizes.items():
+            print(f"  Worker {address[0]}:{address[1]} holds {size} words")
+
+        # Scatter the encrypted query and gather the encrypted results
+        print("Computing encrypted cosine similarities on all shards...")
+        scatter_gather_query(
+            worker_addresses,
+            encrypted_query_path=os.path.join(script_dir, data_dir, 'encrypted_query.bin'),
+            results_path=os.path.join(script_dir, data_dir, 'encrypted_results.bin'),
+            vocabulary_fingerprint=store_header['vocabulary_fingerprint'],
+            store_fingerprint=store_header['store_fingerprint']
+        )
+    finally:
+        stop_workers(worker_addresses)
+        join_workers(processes)
+
+    # End timer
+    end_time = time.time()
+    print(f"Distributed computation completed in {end_time - start_time:.2f} seconds.")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,12 +7,16 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from vector_database.display import (
     load_encrypted_results,
+    load_encrypted_results_header,
     decrypt_results,
-    compute_plaintext_similarities,
+    top_k,
+    compute_plaintext_similarity_array,
     display_results,
 )
 
-from vector_database.data_loader import load_word_embeddings
+from vector_database.data_loader import load_embedding_matrix
+from vector_database.vocabulary import load_vocabulary, word_id
+from vector_database.cache import ResultCache
 import time
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -24,11 +28,14 @@ def main():
     # Start timer
     start_time = time.time()
 
-    # Load encrypted results and private context
+    # Load the vocabulary, encrypted results and private context
     print("Loading encrypted results and private context...")
+    vocabulary = load_vocabulary(os.path.join(script_dir, data_dir, 'vocabulary.txt'))
+    results_path = os.path.join(script_dir, data_dir, 'encrypted_results.bin')
     encrypted_results, context = load_encrypted_results(
-        results_path=os.path.join(script_dir, data_dir, 'encrypted_results.bin'),
-        context_private_path=os.path.join(script_dir, data_dir, 'context_private.bin')
+        results_path=results_path,
+        context_private_path=os.path.join(script_dir, data_dir, 'context_private.bin'),
+        vocabulary=vocabulary
     )
 
     # Decrypt results
@@ -38,17 +45,28 @@ def main():
     # Load embeddings and query vector
     print("Loading embeddings and query vector...")
     embeddings_path = os.path.join(script_dir, data_dir, 'word_embeddings.txt')
-    embeddings = load_word_embeddings(embeddings_path)
+    _, matrix = load_embedding_matrix(embeddings_path)
     query_word = 'king'
-    query_vector = embeddings[query_word]
+    query_vector = matrix[word_id(vocabulary, query_word)]
 
     # Compute plaintext cosine similarities
     print("Computing plaintext cosine similarities...")
-    plaintext_results = compute_plaintext_similarities(embeddings, query_vector)
+    plaintext_results = compute_plaintext_similarity_array(matrix, query_vector)
 
     # Display results
     print("Displaying results...")
-    display_results(decrypted_results, plaintext_results)
+    display_results(decrypted_results, plaintext_results, vocabulary=vocabulary)
+
+    # Cache the top results, so query.py can answer this query again without a round trip
+    k = 10
+    store_fingerprint = load_encrypted_results_header(results_path).get('store_fingerprint')
+    if store_fingerprint is not None:
+        ResultCache(os.path.join(script_dir, data_dir, 'result_cache.pkl')).put(
+            query_word,
+            store_fingerprint,
+            [(result_id, decrypted_results[result_id]) for result_id in top_k(decrypted_results, k)],
+            k
+        )
 
     # End timer
     end_time = time.time()
@@ -7,8 +7,9 @@ import sys
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from vector_database.data_loader import load_word_embeddings
-from vector_database.encryption import create_contexts, encrypt_embeddings, encrypt_query
+from vector_database.data_loader import load_embedding_matrix
+from vector_database.encryption import create_contexts, encrypt_embedding_matrix, encrypt_query
+from vector_database.vocabulary import word_id
 
 
 def main():
@@ -19,7 +20,8 @@ def main():
     # Start timer
     start_time = time.time()
 
-    # Create contexts
+    # Create contexts. The data owner holds the secret key here, so the
+    # embeddings and query are encrypted symmetrically with it and saved seeded.
     print("Creating contexts...")
     create_contexts()
 
@@ -30,16 +32,20 @@ def main():
     file_name = 'word_embeddings.txt'
     file_dir = os.path.join(script_dir,  data_dir)
     file_dir = os.path.join(file_dir,  file_name)
-    embeddings = load_word_embeddings(file_dir)
+    vocabulary, matrix = load_embedding_matrix(file_dir)
 
     # Encrypt embeddings
     print("Encrypting embeddings...")
-    encrypt_embeddings(embeddings)
+    encrypt_embedding_matrix(vocabulary, matrix, context_private_path='data/context_private.bin')
 
     # Encrypt query word
     query_word = 'king'
     print(f"Encrypting query word '{query_word}'...")
-    encrypt_query(query_word, embeddings)
+    encrypt_query(
+        query_word,
+        {query_word: matrix[word_id(vocabulary, query_word)]},
+        context_private_path='data/context_private.bin'
+    )
 
     # End timer
     end_time = time.time()
@@ -0,0 +1,96 @@
+# query.py
+# Client-side query with a result cache. Repeat queries against the same
+# encrypted store are answered from data/result_cache.pkl without the
+# encrypt -> compute -> decrypt round trip. On a miss, the round trip runs
+# here (the compute step as in compute.py) and its top results are cached.
+# Run main.py first. Re-encrypting the store invalidates the cache.
+
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from vector_database.cache import ResultCache
+from vector_database.computation import (
+    load_encrypted_embeddings,
+    load_encrypted_store_header,
+    load_encrypted_query,
+    compute_encrypted_cosine_similarities,
+    save_encrypted_results,
+)
+from vector_database.data_loader import load_embedding_matrix
+from vector_database.display import load_encrypted_results, decrypt_results, top_k
+from vector_database.encryption import encrypt_query
+from vector_database.vocabulary import load_vocabulary, word_id
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = 'data'
+
+
+def main():
+    query_word = 'king'
+    k = 10
+
+    # Start timer
+    start_time = time.time()
+
+    context_public_path = os.path.join(script_dir, data_dir, 'context_public.bin')
+    context_private_path = os.path.join(script_dir, data_dir, 'context_private.bin')
+    encrypted_data_path = os.path.join(script_dir, data_dir, 'encrypted_vectors.bin')
+    encrypted_query_path = os.path.join(script_dir, data_dir, 'encrypted_query.bin')
+    results_path = os.path.join(script_dir, data_dir, 'encrypted_results.bin')
+
+    vocabulary = load_vocabulary(os.path.join(script_dir, data_dir, 'vocabulary.txt'))
+    store_header = load_encrypted_store_header(encrypted_data_path)
+    cache = ResultCache(os.path.join(script_dir, data_dir, 'result_cache.pkl'))
+
+    # Client: look the query up against the current version of the store
+    results = cache.get(query_word, store_header['store_fingerprint'], k)
+
+    if results is None:
+        print(f"Cache miss for '{query_word}', running the encrypted query...")
+
+        # Client: encrypt the query
+        _, matrix = load_embedding_matrix(os.path.join(script_dir, data_dir, 'word_embeddings.txt'))
+        encrypt_query(
+            query_word,
+            {query_word: matrix[word_id(vocabulary, query_word)]},
+            encrypted_query_path=encrypted_query_path,
+            context_private_path=context_private_path
+        )
+
+        # Server: compute the encrypted similarities
+        encrypted_embeddings, _ = load_encrypted_embeddings(encrypted_data_path, context_public_path)
+        encrypted_query_vector, encrypted_query_inv_norm = load_encrypted_query(encrypted_query_path, context_public_path)
+        encrypted_results = compute_encrypted_cosine_similarities(
+            encrypted_query_vector, encrypted_query_inv_norm, encrypted_embeddings
+        )
+        save_encrypted_results(
+            encrypted_results,
+            results_path=results_path,
+            vocabulary_fingerprint=store_header['vocabulary_fingerprint'],
+            store_fingerprint=store_header['store_fingerprint']
+        )
+
+        # Client: decrypt and cache the top results
+        encrypted_results, _ = load_encrypted_results(results_path, context_private_path, vocabulary=vocabulary)
+        decrypted_results = decrypt_results(encrypted_results)
+        results = [(result_id, decrypted_results[result_id]) for result_id in top_k(decrypted_results, k)]
+        cache.put(query_word, store_header['store_fingerprint'], results, k)
+    else:
+        print(f"Cache hit for '{query_word}'")
+
+    print(f"\nTop {k} results:")
+    for result_id, similarity in results:
+        print(f"Word: {vocabulary[result_id]}")
+        print(f"  Decrypted Cosine Similarity: {similarity}")
+
+    # End timer
+    end_time = time.time()
+    print(f"\nQuery completed in {end_time - start_time:.2f} seconds.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# tests/test_cache.py
+
+import unittest
+from unittest.mock import patch
+import numpy as np
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the functions to be tested
+from vector_database.cache import ResultCache
+from vector_database.computation import load_encrypted_store_header
+from vector_database.encryption import create_contexts, encrypt_embeddings
+from vector_database.schemes import SCHEME_BFV
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp_dir.name, 'result_cache.pkl')
+        self.results = [(2, 1.0), (0, 0.7), (1, 0.3)]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_hit_and_miss(self):
+        cache = ResultCache(self.cache_path)
+        self.assertIsNone(cache.get('king', 'store1', 3))
+
+        cache.put('king', 'store1', self.results, 3)
+        self.assertEqual(cache.get('king', 'store1', 3), self.results)
+        self.assertEqual(cache.get('king', 'store1', 2), self.results[:2])
+        # More results than were cached is a miss
+        self.assertIsNone(cache.get('king', 'store1', 5))
+
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 2, 'entries': 1})
+
+    def test_persists_across_instances(self):
+        ResultCache(self.cache_path).put('king', 'store1', self.results, 3)
+        self.assertEqual(ResultCache(self.cache_path).get('king', 'store1', 3), self.results)
+
+    def test_store_change_invalidates(self):
+        cache = ResultCache(self.cache_path)
+        cache.put('king', 'store1', self.results, 3)
+        cache.put('queen', 'store1', self.results, 3)
+
+        self.assertIsNone(cache.get('king', 'store2', 3))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_ttl_expiry(self):
+        cache = ResultCache(self.cache_path, ttl_seconds=60)
+        now = time.time()
+        with patch('vector_database.cache.time.time', return_value=now):
+            cache.put('king', 'store1', self.results, 3)
+        with patch('vector_database.cache.time.time', return_value=now + 30):
+            self.assertEqual(cache.get('king', 'store1', 3), self.results)
+        with patch('vector_database.cache.time.time', return_value=now + 61):
+            self.assertIsNone(cache.get('king', 'store1', 3))
+
+    def test_size_eviction(self):
+        cache = ResultCache(self.cache_path, max_entries=2)
+        cache.put('king', 'store1', self.results, 3)
+        cache.put('queen', 'store1', self.results, 3)
+        # Using 'king' makes 'queen' the least recently used
+        cache.get('king', 'store1', 3)
+        cache.put('prince', 'store1', self.results, 3)
+
+        self.assertIsNone(cache.get('queen', 'store1', 3))
+        self.assertIsNotNone(cache.get('king', 'store1', 3))
+        self.assertIsNotNone(cache.get('prince', 'store1', 3))
+
+    def test_hit_does_not_rewrite_file(self):
+        cache = ResultCache(self.cache_path)
+        cache.put('king', 'store1', self.results, 3)
+
+        with patch.object(cache, '_save') as mock_save:
+            self.assertEqual(cache.get('king', 'store1', 3), self.results)
+            self.assertIsNone(cache.get('queen', 'store1', 3))
+        mock_save.assert_not_called()
+
+    def test_concurrent_writers(self):
+        caches = [ResultCache(self.cache_path) for _ in range(8)]
+        def put_all(cache):
+            for i in range(20):
+                cache.put(f'word{i}', 'store1', self.results, 3)
+
+        with ThreadPoolExecutor(max_workers=len(caches)) as executor:
+            list(executor.map(put_all, caches))
+
+        # Every write used its own temporary file, and none is left behind
+        self.assertEqual(os.listdir(self.tmp_dir.name), ['result_cache.pkl'])
+        self.assertEqual(ResultCache(self.cache_path).get('word19', 'store1', 3), self.results)
+
+    def test_store_fingerprint_changes_on_reencryption(self):
+        plain_embeddings = {f'word{i}': np.array([0.1 * i, 0.2, 0.3]) for i in range(1, 4)}
+        context_public_path = os.path.join(self.tmp_dir.name, 'context_public.bin')
+        encrypted_data_path = os.path.join(self.tmp_dir.name, 'encrypted_vectors.bin')
+        create_contexts(context_dir=self.tmp_dir.name, scheme=SCHEME_BFV, poly_modulus_degree=4096)
+
+        fingerprints = []
+        for _ in range(2):
+            encrypt_embeddings(plain_embeddings, context_public_path, encrypted_data_path, vocabulary_path=None)
+            fingerprints.append(load_encrypted_store_header(encrypted_data_path)['store_fingerprint'])
+        self.assertNotEqual(fingerprints[0], fingerprints[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
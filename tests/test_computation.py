@@ -3,6 +3,7 @@
 import unittest
 import numpy as np
 import tenseal as ts
+from concurrent.futures import ThreadPoolExecutor
 
 import os
 import sys
@@ -11,7 +12,10 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 # Import the functions to be tested
 from vector_database.computation import (
     encrypted_cosine_similarity,
-    compute_encrypted_cosine_similarities
+    encrypted_cosine_similarity_manual,
+    compute_encrypted_cosine_similarities,
+    SCHEDULE_AUTO,
+    SCHEDULE_MANUAL
 )
 
 class TestComputation(unittest.TestCase):
@@ -120,5 +124,108 @@ class TestComputation(unittest.TestCase):
                 msg=f"Mismatch in cosine similarity for {word}"
             )
 
+    def test_encrypted_cosine_similarity_manual(self):
+        # Compute encrypted cosine similarity with the manual schedule
+        encrypted_cos_sim = encrypted_cosine_similarity_manual(
+            self.encrypted_vector_A,
+            self.encrypted_vector_B,
+            self.encrypted_inv_norm_A,
+            self.encrypted_inv_norm_B
+        )
+
+        # Decrypt the result
+        decrypted_cos_sim = encrypted_cos_sim.decrypt()[0]
+
+        # Compute expected cosine similarity
+        dot_product = np.dot(self.plain_vector_A, self.plain_vector_B)
+        expected_cos_sim = dot_product * self.plain_inv_norm_A * self.plain_inv_norm_B
+
+        # The manual schedule must stay within the same tolerance as the automatic one
+        self.assertAlmostEqual(decrypted_cos_sim, expected_cos_sim, places=4)
+
+        # The result is relinearized, and ends one prime below the automatic kernel's
+        self.assertEqual(encrypted_cos_sim.data.ciphertext()[0].size(), 2)
+        auto_cos_sim = encrypted_cosine_similarity(
+            self.encrypted_vector_A,
+            self.encrypted_vector_B,
+            self.encrypted_inv_norm_A,
+            self.encrypted_inv_norm_B
+        )
+        self.assertLess(
+            encrypted_cos_sim.data.ciphertext()[0].coeff_modulus_size(),
+            auto_cos_sim.data.ciphertext()[0].coeff_modulus_size()
+        )
+        self.assertLess(len(encrypted_cos_sim.serialize()), len(auto_cos_sim.serialize()))
+
+    def test_compute_encrypted_cosine_similarities_manual(self):
+        # Compute encrypted cosine similarities with both schedules
+        auto_results = compute_encrypted_cosine_similarities(
+            self.encrypted_query_vector,
+            self.encrypted_query_inv_norm,
+            self.encrypted_embeddings
+        )
+        manual_results = compute_encrypted_cosine_similarities(
+            self.encrypted_query_vector,
+            self.encrypted_query_inv_norm,
+            self.encrypted_embeddings,
+            schedule=SCHEDULE_MANUAL
+        )
+
+        # Both schedules share the input ciphertexts, so they must agree within the tolerance
+        for word in self.plain_embeddings:
+            self.assertAlmostEqual(
+                manual_results[word].decrypt()[0],
+                auto_results[word].decrypt()[0],
+                places=4,
+                msg=f"Schedules disagree for {word}"
+            )
+
+    def test_schedules_share_stored_operands(self):
+        # Operands deserialized against a public context, as on the compute server
+        public_context = ts.context_from(self.context.serialize())
+        public_context.make_context_public()
+        vector_A, vector_B, inv_norm_A, inv_norm_B = [
+            ts.ckks_vector_from(public_context, enc.serialize())
+            for enc in (self.encrypted_vector_A, self.encrypted_vector_B, self.encrypted_inv_norm_A, self.encrypted_inv_norm_B)
+        ]
+        operands = (vector_A, vector_B, inv_norm_A, inv_norm_B)
+        levels = [enc.data.ciphertext()[0].coeff_modulus_size() for enc in operands]
+        expected_cos_sim = np.dot(self.plain_vector_A, self.plain_vector_B) * self.plain_inv_norm_A * self.plain_inv_norm_B
+
+        # Neither kernel lowers the operands it is given, so each can run after the other
+        for cosine_similarity in (encrypted_cosine_similarity, encrypted_cosine_similarity_manual, encrypted_cosine_similarity):
+            encrypted_cos_sim = cosine_similarity(*operands)
+            self.assertEqual([enc.data.ciphertext()[0].coeff_modulus_size() for enc in operands], levels)
+            encrypted_cos_sim.link_context(self.context)
+            self.assertAlmostEqual(encrypted_cos_sim.decrypt()[0], expected_cos_sim, places=4)
+
+    def test_concurrent_schedules_on_shared_context(self):
+        def run(schedule):
+            results = compute_encrypted_cosine_similarities(
+                self.encrypted_query_vector,
+                self.encrypted_query_inv_norm,
+                self.encrypted_embeddings,
+                schedule=schedule
+            )
+            return {word: enc_cos_sim.decrypt()[0] for word, enc_cos_sim in results.items()}
+
+        schedules = [SCHEDULE_AUTO, SCHEDULE_MANUAL] * 2
+        with ThreadPoolExecutor(max_workers=len(schedules)) as executor:
+            all_results = list(executor.map(run, schedules))
+
+        for results in all_results:
+            for word, vector in self.plain_embeddings.items():
+                expected_cos_sim = np.dot(self.plain_query_vector, vector) * self.plain_query_inv_norm / np.linalg.norm(vector)
+                self.assertAlmostEqual(results[word], expected_cos_sim, places=3)
+
+    def test_compute_encrypted_cosine_similarities_unknown_schedule(self):
+        with self.assertRaises(ValueError):
+            compute_encrypted_cosine_similarities(
+                self.encrypted_query_vector,
+                self.encrypted_query_inv_norm,
+                self.encrypted_embeddings,
+                schedule='lazy'
+            )
+
 if __name__ == '__main__':
     unittest.main()
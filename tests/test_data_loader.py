@@ -6,7 +6,7 @@ import sys
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from vector_database.data_loader import load_word_embeddings
+from vector_database.data_loader import load_word_embeddings, load_embedding_matrix
 
 sample_content = (
             "word1 0.1 0.2 0.3\n"
@@ -62,5 +62,14 @@ class TestDataLoader(unittest.TestCase):
             self.assertIn(word, embeddings)
             np.testing.assert_array_almost_equal(embeddings[word], vector)
 
+    @patch('builtins.open', new_callable=mock_open, read_data="word2 0.0 0.0 0.0\n" + sample_content)
+    def test_load_embedding_matrix(self, mock_file):
+        vocabulary, matrix = load_embedding_matrix("embeddings.txt")
+        self.assertEqual(vocabulary.tolist(), ['word1', 'word2', 'word3'])
+        self.assertEqual(matrix.dtype, np.float32)
+        # Repeated words keep their last vector, as in load_word_embeddings
+        for row, word in enumerate(vocabulary):
+            np.testing.assert_array_almost_equal(matrix[row], self.expected_embeddings[word])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,204 @@
+# tests/test_registry.py
+
+import unittest
+from unittest.mock import patch
+import numpy as np
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the functions to be tested
+from vector_database.registry import ContextRegistry, key_fingerprint
+from vector_database.encryption import create_contexts, encrypt_embeddings, encrypt_query
+from vector_database.display import load_encrypted_results, decrypt_results
+from vector_database.computation import save_encrypted_results
+from vector_database.vocabulary import build_vocabulary, word_id
+
+
+class TestContextRegistry(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.plain_embeddings = {f'word{i}': rng.normal(size=8) for i in range(4)}
+        self.query_word = 'word1'
+
+        # Two tenants with their own keys. Unit-length vectors need a single
+        # multiplication, so a small context is enough.
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tenant_dirs = []
+        for tenant in ('a', 'b'):
+            tenant_dir = os.path.join(self.tmp_dir.name, tenant)
+            os.makedirs(tenant_dir)
+            create_contexts(poly_modulus_degree=8192, coeff_mod_bit_sizes=[60, 40, 60], context_dir=tenant_dir)
+            encrypt_embeddings(
+                self.plain_embeddings,
+                context_public_path=os.path.join(tenant_dir, 'context_public.bin'),
+                encrypted_data_path=os.path.join(tenant_dir, 'encrypted_vectors.bin'),
+                unit_norm=True,
+                vocabulary_path=None
+            )
+            self.tenant_dirs.append(tenant_dir)
+
+        self.tenant_size = (
+            os.path.getsize(os.path.join(self.tenant_dirs[0], 'context_public.bin'))
+            + os.path.getsize(os.path.join(self.tenant_dirs[0], 'encrypted_vectors.bin'))
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def register_tenants(self, registry):
+        return [
+            registry.register(
+                os.path.join(tenant_dir, 'context_public.bin'),
+                os.path.join(tenant_dir, 'encrypted_vectors.bin')
+            )
+            for tenant_dir in self.tenant_dirs
+        ]
+
+    def test_key_fingerprint(self):
+        fingerprints = [key_fingerprint(os.path.join(tenant_dir, 'context_public.bin')) for tenant_dir in self.tenant_dirs]
+        self.assertNotEqual(fingerprints[0], fingerprints[1])
+        self.assertEqual(fingerprints[0], key_fingerprint(os.path.join(self.tenant_dirs[0], 'context_public.bin')))
+
+    def test_hits_and_misses(self):
+        registry = ContextRegistry()
+        fingerprint_a, fingerprint_b = self.register_tenants(registry)
+        self.assertEqual(registry.stats()['resident'], 0)
+
+        registry.get(fingerprint_a)
+        registry.get(fingerprint_a)
+        _, encrypted_embeddings = registry.get(fingerprint_b)
+        self.assertEqual(len(encrypted_embeddings), len(self.plain_embeddings))
+
+        stats = registry.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 2, 0))
+        self.assertEqual(stats['resident'], 2)
+
+    def test_lru_eviction_and_reload(self):
+        # Room for one tenant only
+        registry = ContextRegistry(max_bytes=self.tenant_size * 3 // 2)
+        fingerprint_a, fingerprint_b = self.register_tenants(registry)
+
+        registry.get(fingerprint_a)
+        registry.get(fingerprint_b)
+        stats = registry.stats()
+        self.assertEqual((stats['resident'], stats['evictions']), (1, 1))
+        self.assertLessEqual(stats['resident_bytes'], registry.max_bytes)
+
+        # The evicted tenant is reloaded on demand
+        registry.get(fingerprint_a)
+        stats = registry.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (0, 3, 2))
+
+    def test_evicts_before_loading(self):
+        registry = ContextRegistry(max_bytes=self.tenant_size * 3 // 2)
+        fingerprint_a, fingerprint_b = self.register_tenants(registry)
+        registry.get(fingerprint_a)
+
+        # The evicted tenant is gone before the next one is loaded, not after
+        load = registry._load
+        resident_during_load = []
+        def recording_load(*paths):
+            resident_during_load.append(list(registry._resident))
+            return load(*paths)
+
+        with patch.object(registry, '_load', side_effect=recording_load):
+            registry.get(fingerprint_b)
+        self.assertEqual(resident_during_load, [[]])
+        self.assertEqual(registry.stats()['evictions'], 1)
+
+    def test_load_outside_registry_lock(self):
+        registry = ContextRegistry()
+        fingerprint_a, fingerprint_b = self.register_tenants(registry)
+        registry.get(fingerprint_b)
+
+        load = registry._load
+        loading = threading.Event()
+        release = threading.Event()
+        def blocking_load(*paths):
+            loading.set()
+            release.wait(timeout=30)
+            return load(*paths)
+
+        with patch.object(registry, '_load', side_effect=blocking_load) as mock_load:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [executor.submit(registry.get, fingerprint_a) for _ in range(3)]
+                self.assertTrue(loading.wait(timeout=30))
+
+                # A resident tenant is served while another tenant is loading
+                executor.submit(registry.get, fingerprint_b).result(timeout=10)
+
+                release.set()
+                for future in futures:
+                    future.result()
+
+        # Concurrent requests for the same tenant share a single load
+        self.assertEqual(mock_load.call_count, 1)
+        stats = registry.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (3, 2))
+
+    def test_seeded_store_counted_expanded(self):
+        # A store encrypted by the data owner is saved seeded, at about half its deserialized size
+        tenant_dir = os.path.join(self.tmp_dir.name, 'seeded')
+        os.makedirs(tenant_dir)
+        create_contexts(poly_modulus_degree=8192, coeff_mod_bit_sizes=[60, 40, 60], context_dir=tenant_dir)
+        encrypt_embeddings(
+            self.plain_embeddings,
+            context_public_path=os.path.join(tenant_dir, 'context_public.bin'),
+            encrypted_data_path=os.path.join(tenant_dir, 'encrypted_vectors.bin'),
+            unit_norm=True,
+            vocabulary_path=None,
+            context_private_path=os.path.join(tenant_dir, 'context_private.bin')
+        )
+        context_size = os.path.getsize(os.path.join(tenant_dir, 'context_public.bin'))
+        store_size = os.path.getsize(os.path.join(tenant_dir, 'encrypted_vectors.bin'))
+
+        registry = ContextRegistry()
+        fingerprint = registry.register(
+            os.path.join(tenant_dir, 'context_public.bin'),
+            os.path.join(tenant_dir, 'encrypted_vectors.bin')
+        )
+        _, encrypted_embeddings = registry.get(fingerprint)
+        self.assertEqual(registry.stats()['resident_bytes'], context_size + 2 * store_size)
+
+        # The estimate tracks the expanded ciphertexts, not the seeded file
+        expanded_size = sum(len(enc_data['encrypted_vector'].serialize()) for enc_data in encrypted_embeddings.values())
+        self.assertLess(abs(expanded_size - 2 * store_size), 0.05 * expanded_size)
+
+    def test_unknown_fingerprint(self):
+        registry = ContextRegistry()
+        with self.assertRaises(KeyError):
+            registry.get('0' * 16)
+
+    def test_query(self):
+        registry = ContextRegistry()
+        fingerprint_a, _ = self.register_tenants(registry)
+        tenant_dir = self.tenant_dirs[0]
+        encrypted_query_path = os.path.join(tenant_dir, 'encrypted_query.bin')
+        results_path = os.path.join(tenant_dir, 'encrypted_results.bin')
+
+        encrypt_query(
+            self.query_word,
+            self.plain_embeddings,
+            context_public_path=os.path.join(tenant_dir, 'context_public.bin'),
+            encrypted_query_path=encrypted_query_path,
+            unit_norm=True
+        )
+        save_encrypted_results(registry.query(fingerprint_a, encrypted_query_path), results_path)
+        encrypted_results, _ = load_encrypted_results(results_path, os.path.join(tenant_dir, 'context_private.bin'))
+        decrypted_results = decrypt_results(encrypted_results)
+
+        vocabulary = build_vocabulary(self.plain_embeddings)
+        query_vector = self.plain_embeddings[self.query_word]
+        for word, vector in self.plain_embeddings.items():
+            expected_cos_sim = np.dot(query_vector, vector) / (np.linalg.norm(query_vector) * np.linalg.norm(vector))
+            self.assertAlmostEqual(decrypted_results[word_id(vocabulary, word)], expected_cos_sim, places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
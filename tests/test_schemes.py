@@ -0,0 +1,240 @@
+# tests/test_schemes.py
+
+import unittest
+import numpy as np
+import tenseal as ts
+import tempfile
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the functions to be tested
+from vector_database.benchmark import ranking_agreement
+from vector_database.computation import (
+    compute_encrypted_cosine_similarities,
+    load_encrypted_embeddings,
+    load_encrypted_query,
+    load_encrypted_store_header,
+    SCHEDULE_AUTO,
+    SCHEDULE_MANUAL
+)
+from vector_database.data_loader import quantize_vector
+from vector_database.display import compute_plaintext_similarities, decrypt_results
+from vector_database.encryption import create_contexts, encrypt_embeddings, encrypt_query
+from vector_database.schemes import SCHEME_BFV, SCHEME_CKKS, context_scheme, new_context, encrypt_embedding
+
+
+class TestSchemes(unittest.TestCase):
+
+    def setUp(self):
+        self.plain_embeddings = {
+            'word1': np.array([0.1, 0.2, 0.3]),
+            'word2': np.array([0.4, 0.5, 0.6]),
+            'word3': np.array([0.7, -0.8, 0.9]),
+            'word4': np.array([-0.3, 0.1, 0.05])
+        }
+        self.query_word = 'word2'
+
+    def test_quantize_vector(self):
+        for vector in self.plain_embeddings.values():
+            quantized_vector = quantize_vector(vector)
+            self.assertEqual(quantized_vector.dtype, np.int64)
+            self.assertLessEqual(np.abs(quantized_vector).max(), 127)
+            np.testing.assert_allclose(
+                quantized_vector / 127.0, vector / np.linalg.norm(vector), atol=0.5 / 127
+            )
+
+    def test_context_scheme(self):
+        self.assertEqual(context_scheme(new_context(SCHEME_BFV, poly_modulus_degree=4096)), SCHEME_BFV)
+        self.assertEqual(
+            context_scheme(new_context(SCHEME_CKKS, poly_modulus_degree=8192, coeff_mod_bit_sizes=[60, 40, 60])),
+            SCHEME_CKKS
+        )
+
+    def test_bfv_similarities_match_plaintext(self):
+        context = new_context(SCHEME_BFV)
+
+        encrypted_embeddings = {}
+        for word, vector in self.plain_embeddings.items():
+            encrypted_vector, encrypted_inv_norm = encrypt_embedding(context, vector)
+            self.assertIsNone(encrypted_inv_norm)
+            encrypted_embeddings[word] = {
+                'encrypted_vector': encrypted_vector,
+                'encrypted_inv_norm': encrypted_inv_norm
+            }
+        encrypted_query_vector, encrypted_query_inv_norm = encrypt_embedding(
+            context, self.plain_embeddings[self.query_word]
+        )
+
+        encrypted_results = compute_encrypted_cosine_similarities(
+            encrypted_query_vector, encrypted_query_inv_norm, encrypted_embeddings
+        )
+        for enc_value in encrypted_results.values():
+            self.assertIsInstance(enc_value, ts.BFVVector)
+
+        decrypted_results = decrypt_results(encrypted_results)
+        plaintext_results = compute_plaintext_similarities(
+            self.plain_embeddings, self.plain_embeddings[self.query_word]
+        )
+
+        # Quantization to 127 levels bounds the error well below the gaps between words
+        for word in self.plain_embeddings:
+            self.assertAlmostEqual(
+                decrypted_results[word],
+                plaintext_results[word],
+                delta=0.02,
+                msg=f"Mismatch in cosine similarity for {word}"
+            )
+        self.assertEqual(ranking_agreement(decrypted_results, plaintext_results, k=2)['top_k_overlap'], 1.0)
+
+    def test_bfv_pipeline_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            context_public_path = os.path.join(tmp_dir, 'context_public.bin')
+            encrypted_data_path = os.path.join(tmp_dir, 'encrypted_vectors.bin')
+            encrypted_query_path = os.path.join(tmp_dir, 'encrypted_query.bin')
+            vocabulary_path = os.path.join(tmp_dir, 'vocabulary.txt')
+
+            create_contexts(context_dir=tmp_dir, scheme=SCHEME_BFV, poly_modulus_degree=4096)
+            encrypt_embeddings(
+                self.plain_embeddings, context_public_path, encrypted_data_path, vocabulary_path=vocabulary_path
+            )
+            encrypt_query(self.query_word, self.plain_embeddings, context_public_path, encrypted_query_path)
+
+            encrypted_embeddings, context = load_encrypted_embeddings(encrypted_data_path, context_public_path)
+            encrypted_query_vector, encrypted_query_inv_norm = load_encrypted_query(
+                encrypted_query_path, context_public_path
+            )
+
+        self.assertEqual(context_scheme(context), SCHEME_BFV)
+        self.assertIsNone(encrypted_query_inv_norm)
+        self.assertEqual(sorted(encrypted_embeddings), list(range(len(self.plain_embeddings))))
+        for enc_data in encrypted_embeddings.values():
+            self.assertIsInstance(enc_data['encrypted_vector'], ts.BFVVector)
+            self.assertIsNone(enc_data['encrypted_inv_norm'])
+
+    def test_symmetric_ingestion_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            context_public_path = os.path.join(tmp_dir, 'context_public.bin')
+            context_private_path = os.path.join(tmp_dir, 'context_private.bin')
+            encrypted_data_path = os.path.join(tmp_dir, 'encrypted_vectors.bin')
+            encrypted_query_path = os.path.join(tmp_dir, 'encrypted_query.bin')
+
+            create_contexts(context_dir=tmp_dir, scheme=SCHEME_BFV, poly_modulus_degree=4096, symmetric=True)
+
+            # The compute server's context holds evaluation keys only
+            with open(context_public_path, 'rb') as f:
+                public_context = ts.context_from(f.read())
+            self.assertTrue(public_context.is_public())
+            with self.assertRaises(ValueError):
+                encrypt_embeddings(self.plain_embeddings, context_public_path, encrypted_data_path, vocabulary_path=None)
+
+            vocabulary = encrypt_embeddings(
+                self.plain_embeddings,
+                context_public_path,
+                encrypted_data_path,
+                vocabulary_path=None,
+                context_private_path=context_private_path
+            )
+            encrypt_query(
+                self.query_word,
+                self.plain_embeddings,
+                context_public_path,
+                encrypted_query_path,
+                context_private_path=context_private_path
+            )
+
+            encrypted_embeddings, _ = load_encrypted_embeddings(encrypted_data_path, context_public_path)
+            encrypted_query_vector, encrypted_query_inv_norm = load_encrypted_query(
+                encrypted_query_path, context_public_path
+            )
+            encrypted_results = compute_encrypted_cosine_similarities(
+                encrypted_query_vector, encrypted_query_inv_norm, encrypted_embeddings
+            )
+
+            with open(context_private_path, 'rb') as f:
+                private_context = ts.context_from(f.read())
+            decrypted_results = decrypt_results({
+                word_id: ts.bfv_vector_from(private_context, enc_value.serialize())
+                for word_id, enc_value in encrypted_results.items()
+            })
+
+        plaintext_results = compute_plaintext_similarities(self.plain_embeddings, self.plain_embeddings[self.query_word])
+        for word_id, word in enumerate(vocabulary):
+            self.assertAlmostEqual(decrypted_results[word_id], plaintext_results[word], delta=0.02)
+
+    def test_seeded_ckks_round_trip(self):
+        rng = np.random.default_rng(0)
+        plain_embeddings = {f'word{i}': rng.normal(size=300) for i in range(4)}
+        # Depth three for the full cosine kernel, within the 218-bit budget of degree 8192
+        parameters = {'poly_modulus_degree': 8192, 'coeff_mod_bit_sizes': [50, 35, 35, 35, 50], 'global_scale': 2 ** 35}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            context_public_path = os.path.join(tmp_dir, 'context_public.bin')
+            context_private_path = os.path.join(tmp_dir, 'context_private.bin')
+            encrypted_data_path = os.path.join(tmp_dir, 'encrypted_vectors.bin')
+            encrypted_query_path = os.path.join(tmp_dir, 'encrypted_query.bin')
+
+            # The same embeddings encrypted with a public key, for comparison
+            public_key_dir = os.path.join(tmp_dir, 'public_key')
+            create_contexts(context_dir=public_key_dir, **parameters)
+            encrypt_embeddings(
+                plain_embeddings,
+                os.path.join(public_key_dir, 'context_public.bin'),
+                os.path.join(public_key_dir, 'encrypted_vectors.bin'),
+                vocabulary_path=None
+            )
+            self.assertFalse(load_encrypted_store_header(os.path.join(public_key_dir, 'encrypted_vectors.bin'))['seeded'])
+
+            create_contexts(context_dir=tmp_dir, symmetric=True, **parameters)
+            vocabulary = encrypt_embeddings(
+                plain_embeddings,
+                context_public_path,
+                encrypted_data_path,
+                vocabulary_path=None,
+                context_private_path=context_private_path
+            )
+            encrypt_query(
+                'word1', plain_embeddings, context_public_path, encrypted_query_path, context_private_path=context_private_path
+            )
+
+            # Seeded ciphertexts halve the store
+            self.assertTrue(load_encrypted_store_header(encrypted_data_path)['seeded'])
+            size_ratio = os.path.getsize(encrypted_data_path) / os.path.getsize(os.path.join(public_key_dir, 'encrypted_vectors.bin'))
+            self.assertAlmostEqual(size_ratio, 0.5, delta=0.05)
+
+            # The compute server expands them under its evaluation-only context
+            encrypted_embeddings, context = load_encrypted_embeddings(encrypted_data_path, context_public_path)
+            self.assertFalse(context.has_secret_key())
+            encrypted_query_vector, encrypted_query_inv_norm = load_encrypted_query(encrypted_query_path, context_public_path)
+
+            with open(context_private_path, 'rb') as f:
+                private_context = ts.context_from(f.read())
+
+            plaintext_results = compute_plaintext_similarities(plain_embeddings, plain_embeddings['word1'])
+            for schedule in (SCHEDULE_AUTO, SCHEDULE_MANUAL):
+                encrypted_results = compute_encrypted_cosine_similarities(
+                    encrypted_query_vector, encrypted_query_inv_norm, encrypted_embeddings, schedule=schedule
+                )
+                decrypted_results = decrypt_results({
+                    word_id: ts.ckks_vector_from(private_context, enc_value.serialize())
+                    for word_id, enc_value in encrypted_results.items()
+                })
+                for word_id, word in enumerate(vocabulary):
+                    self.assertAlmostEqual(decrypted_results[word_id], plaintext_results[word], places=3)
+
+    def test_ranking_agreement(self):
+        reference_results = {'a': 0.9, 'b': 0.5, 'c': 0.1, 'd': -0.2}
+        self.assertEqual(
+            ranking_agreement(reference_results, reference_results, k=2),
+            {'top_k_overlap': 1.0, 'spearman': 1.0}
+        )
+
+        swapped_results = {'a': 0.5, 'b': 0.9, 'c': -0.2, 'd': 0.1}
+        agreement = ranking_agreement(swapped_results, reference_results, k=2)
+        self.assertEqual(agreement['top_k_overlap'], 1.0)
+        self.assertAlmostEqual(agreement['spearman'], 0.6)
+
+
+if __name__ == '__main__':
+    unittest.main()
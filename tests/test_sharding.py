@@ -0,0 +1,176 @@
+# tests/test_sharding.py
+
+import unittest
+import numpy as np
+import tenseal as ts
+import pickle
+import tempfile
+import multiprocessing
+from multiprocessing.connection import Client
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the functions to be tested
+from vector_database.sharding import (
+    assign_shards,
+    shard_owner,
+    start_local_workers,
+    stop_workers,
+    join_workers,
+    distribute_encrypted_embeddings,
+    scatter_gather_query,
+    add_worker,
+)
+from vector_database.encryption import encrypt_embedding_matrix
+from vector_database.data_loader import embeddings_to_matrix
+
+
+class TestShardAssignment(unittest.TestCase):
+
+    def setUp(self):
+        self.ids = list(range(1000))
+        self.worker_addresses = [('localhost', 9000 + i) for i in range(3)]
+
+    def test_assign_shards_covers_all_words_once(self):
+        shards = assign_shards(self.ids, self.worker_addresses)
+        assigned = [word_id for ids in shards.values() for word_id in ids]
+        self.assertEqual(sorted(assigned), self.ids)
+        for ids in shards.values():
+            self.assertGreater(len(ids), 0)
+
+    def test_adding_worker_only_moves_words_to_new_worker(self):
+        new_address = ('localhost', 9003)
+        updated_addresses = self.worker_addresses + [new_address]
+        for word_id in self.ids:
+            before = shard_owner(word_id, self.worker_addresses)
+            after = shard_owner(word_id, updated_addresses)
+            self.assertIn(after, (before, new_address))
+
+
+class TestWorkerLifecycle(unittest.TestCase):
+
+    def setUp(self):
+        self.processes, self.worker_addresses = start_local_workers(1)
+
+    def tearDown(self):
+        stop_workers(self.worker_addresses)
+        join_workers(self.processes)
+
+    def test_worker_survives_bad_requests(self):
+        authkey = multiprocessing.current_process().authkey
+
+        # A client that drops the handshake, and a coordinator that disconnects before sending its request
+        Client(self.worker_addresses[0]).close()
+        Client(self.worker_addresses[0], authkey=authkey).close()
+
+        # A malformed request is answered with an error
+        with Client(self.worker_addresses[0], authkey=authkey) as conn:
+            conn.send(('put',))
+            status, _ = conn.recv()
+        self.assertEqual(status, 'error')
+
+        self.assertEqual(stop_workers(self.worker_addresses), [])
+        join_workers(self.processes)
+        self.assertFalse(self.processes[0].is_alive())
+
+    def test_stop_workers_skips_dead_workers(self):
+        self.processes[0].terminate()
+        join_workers(self.processes)
+        self.assertEqual(stop_workers(self.worker_addresses), [self.worker_addresses[0]])
+
+
+class TestScatterGather(unittest.TestCase):
+
+    def setUp(self):
+        # A smaller context than the default keeps the payloads sent to workers small
+        context = ts.context(
+            ts.SCHEME_TYPE.CKKS,
+            poly_modulus_degree=16384,
+            coeff_mod_bit_sizes=[60] + [40] * 3 + [60]
+        )
+        context.global_scale = 2 ** 40
+        context.generate_galois_keys()
+        context.generate_relin_keys()
+        self.context = context
+
+        self.plain_query_vector = np.array([0.2, 0.3, 0.4])
+        rng = np.random.default_rng(0)
+        self.plain_embeddings = {f'word{i}': rng.uniform(0.1, 1.0, size=3) for i in range(8)}
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.context_public_path = os.path.join(self.tmp_dir.name, 'context_public.bin')
+        self.encrypted_data_path = os.path.join(self.tmp_dir.name, 'encrypted_vectors.bin')
+        self.encrypted_query_path = os.path.join(self.tmp_dir.name, 'encrypted_query.bin')
+        self.results_path = os.path.join(self.tmp_dir.name, 'encrypted_results.bin')
+
+        public_context = context.copy()
+        public_context.make_context_public()
+        with open(self.context_public_path, 'wb') as f:
+            f.write(public_context.serialize())
+
+        self.vocabulary, matrix = embeddings_to_matrix(self.plain_embeddings)
+        encrypt_embedding_matrix(
+            self.vocabulary, matrix, self.context_public_path, self.encrypted_data_path, vocabulary_path=None
+        )
+
+        with open(self.encrypted_query_path, 'wb') as f:
+            pickle.dump({
+                'encrypted_query_vector': ts.ckks_vector(context, self.plain_query_vector).serialize(),
+                'encrypted_query_inv_norm': ts.ckks_vector(context, [1.0 / np.linalg.norm(self.plain_query_vector)]).serialize()
+            }, f)
+
+        self.processes, self.worker_addresses = start_local_workers(3)
+
+    def tearDown(self):
+        stop_workers(self.worker_addresses)
+        join_workers(self.processes)
+        self.tmp_dir.cleanup()
+
+    def assert_results_match_plaintext(self):
+        with open(self.results_path, 'rb') as f:
+            pickle.load(f)
+            results = pickle.load(f)
+        encrypted_results_bytes = dict(zip(results['ids'].tolist(), results['encrypted_results']))
+
+        self.assertEqual(sorted(encrypted_results_bytes), list(range(len(self.plain_embeddings))))
+        for word_id, word in enumerate(self.vocabulary):
+            vector = self.plain_embeddings[word]
+            decrypted_cos_sim = ts.ckks_vector_from(self.context, encrypted_results_bytes[word_id]).decrypt()[0]
+            expected_cos_sim = np.dot(self.plain_query_vector, vector) / (
+                np.linalg.norm(self.plain_query_vector) * np.linalg.norm(vector)
+            )
+            self.assertAlmostEqual(
+                decrypted_cos_sim,
+                expected_cos_sim,
+                places=4,
+                msg=f"Mismatch in cosine similarity for {word}"
+            )
+
+    def test_scatter_gather_query(self):
+        # Batches smaller than the store, so each worker receives its shard over several requests
+        shard_sizes = distribute_encrypted_embeddings(
+            self.worker_addresses[:2], self.encrypted_data_path, self.context_public_path, batch_size=2
+        )
+        shards = assign_shards(range(len(self.plain_embeddings)), self.worker_addresses[:2])
+        self.assertEqual(shard_sizes, {address: len(ids) for address, ids in shards.items()})
+
+        scatter_gather_query(self.worker_addresses[:2], self.encrypted_query_path, self.results_path)
+        self.assert_results_match_plaintext()
+
+    def test_add_worker_rebalances_shards(self):
+        distribute_encrypted_embeddings(
+            self.worker_addresses[:2], self.encrypted_data_path, self.context_public_path
+        )
+        worker_addresses = add_worker(
+            self.worker_addresses[:2], self.worker_addresses[2], self.context_public_path
+        )
+        self.assertEqual(worker_addresses, self.worker_addresses)
+
+        scatter_gather_query(worker_addresses, self.encrypted_query_path, self.results_path)
+        self.assert_results_match_plaintext()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+# tests/test_tiered.py
+
+import unittest
+import numpy as np
+import tempfile
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the functions to be tested
+from vector_database.benchmark import benchmark_tiered_search
+from vector_database.tiered import (
+    fit_coarse_projection,
+    project_embeddings,
+    create_coarse_tier,
+    load_coarse_projection,
+    encrypt_coarse_query,
+    coarse_scan,
+    select_candidates,
+    rerank_candidates,
+)
+from vector_database.display import load_encrypted_results, decrypt_results
+from vector_database.encryption import create_contexts, encrypt_embeddings, encrypt_query
+from vector_database.vocabulary import build_vocabulary, word_id
+
+
+class TestTiered(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.plain_embeddings = {f'word{i}': rng.normal(size=16) for i in range(12)}
+        self.query_word = 'word3'
+
+    def test_fit_coarse_projection(self):
+        projection = fit_coarse_projection(self.plain_embeddings, coarse_dimensions=4)
+        self.assertEqual(projection.shape, (16, 4))
+        # The directions are orthonormal
+        np.testing.assert_array_almost_equal(projection.T @ projection, np.eye(4))
+
+        projected_embeddings = project_embeddings(self.plain_embeddings, projection)
+        for vector in projected_embeddings.values():
+            self.assertEqual(vector.shape, (4,))
+
+    def test_fit_coarse_projection_keeps_all_dimensions(self):
+        self.assertIsNone(fit_coarse_projection(self.plain_embeddings, coarse_dimensions=None))
+        self.assertIsNone(fit_coarse_projection(self.plain_embeddings, coarse_dimensions=16))
+        self.assertIs(project_embeddings(self.plain_embeddings, None), self.plain_embeddings)
+
+    def test_coarse_tier_round_trip(self):
+        with tempfile.TemporaryDirectory() as coarse_dir:
+            create_coarse_tier(self.plain_embeddings, coarse_dir=coarse_dir, coarse_dimensions=8)
+            self.assertEqual(load_coarse_projection(coarse_dir).shape, (16, 8))
+
+            encrypt_coarse_query(self.query_word, self.plain_embeddings, coarse_dir=coarse_dir)
+            coarse_scan(coarse_dir=coarse_dir)
+            candidates = select_candidates(coarse_dir=coarse_dir, num_candidates=5)
+
+        self.assertEqual(len(candidates), 5)
+        # The query word is its own closest match, even in the reduced space
+        vocabulary = build_vocabulary(self.plain_embeddings)
+        self.assertEqual(candidates[0], word_id(vocabulary, self.query_word))
+
+    def test_rerank_candidates(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            coarse_dir = os.path.join(tmp_dir, 'coarse')
+            context_public_path = os.path.join(tmp_dir, 'context_public.bin')
+            encrypted_data_path = os.path.join(tmp_dir, 'encrypted_vectors.bin')
+            encrypted_query_path = os.path.join(tmp_dir, 'encrypted_query.bin')
+            results_path = os.path.join(tmp_dir, 'encrypted_results.bin')
+
+            # A unit-length full-precision store needs a single multiplication, so a small context is enough
+            create_contexts(poly_modulus_degree=8192, coeff_mod_bit_sizes=[60, 40, 60], context_dir=tmp_dir)
+            encrypt_embeddings(self.plain_embeddings, context_public_path, encrypted_data_path, unit_norm=True, vocabulary_path=None)
+            encrypt_query(self.query_word, self.plain_embeddings, context_public_path, encrypted_query_path, unit_norm=True)
+            create_coarse_tier(self.plain_embeddings, coarse_dir=coarse_dir, coarse_dimensions=8)
+
+            candidates = [7, 0, 3]
+            rerank_candidates(
+                candidates, encrypted_data_path, encrypted_query_path, context_public_path, results_path, coarse_dir=coarse_dir
+            )
+            encrypted_results, _ = load_encrypted_results(results_path, os.path.join(tmp_dir, 'context_private.bin'))
+            decrypted_results = decrypt_results(encrypted_results)
+
+            vocabulary = build_vocabulary(self.plain_embeddings)
+            query_vector = self.plain_embeddings[self.query_word]
+            self.assertEqual(sorted(decrypted_results), sorted(candidates))
+            for candidate in candidates:
+                vector = self.plain_embeddings[vocabulary[candidate]]
+                expected_cos_sim = np.dot(query_vector, vector) / (np.linalg.norm(query_vector) * np.linalg.norm(vector))
+                self.assertAlmostEqual(decrypted_results[candidate], expected_cos_sim, places=3)
+
+            # A coarse tier built from another vocabulary would rerank the wrong words
+            other_embeddings = dict(self.plain_embeddings, extra=np.ones(16))
+            create_coarse_tier(other_embeddings, coarse_dir=coarse_dir, coarse_dimensions=8)
+            with self.assertRaises(ValueError):
+                rerank_candidates(
+                    candidates, encrypted_data_path, encrypted_query_path, context_public_path, results_path, coarse_dir=coarse_dir
+                )
+
+    def test_benchmark_tiered_search_full_candidates(self):
+        # Reranking every word must reproduce the full scan exactly
+        report = benchmark_tiered_search(
+            self.plain_embeddings,
+            self.query_word,
+            k=3,
+            num_candidates=len(self.plain_embeddings),
+            coarse_dimensions=4,
+            poly_modulus_degree=16384
+        )
+        self.assertEqual(report['num_candidates'], len(self.plain_embeddings))
+        self.assertEqual(report['coarse_dimensions'], 4)
+        self.assertEqual(report['recall'], 1.0)
+        self.assertEqual(report['tiered_top_k'][0], self.query_word)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# tests/test_vocabulary.py
+
+import unittest
+import numpy as np
+import pickle
+import tempfile
+
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Import the functions to be tested
+from vector_database.vocabulary import (
+    build_vocabulary,
+    word_ids,
+    word_id,
+    vocabulary_fingerprint,
+    save_vocabulary,
+    load_vocabulary,
+)
+from vector_database.data_loader import embeddings_to_matrix
+from vector_database.computation import load_encrypted_embeddings_bytes, iter_encrypted_embeddings_bytes
+from vector_database.encryption import create_contexts, encrypt_embeddings
+from vector_database.schemes import SCHEME_BFV
+
+
+class TestVocabulary(unittest.TestCase):
+
+    def setUp(self):
+        self.words = ['queen', 'king', 'apple', 'king', 'banana']
+
+    def test_build_vocabulary(self):
+        vocabulary = build_vocabulary(self.words)
+        self.assertEqual(vocabulary.tolist(), ['apple', 'banana', 'king', 'queen'])
+
+    def test_word_ids(self):
+        vocabulary = build_vocabulary(self.words)
+        self.assertEqual(word_ids(vocabulary, ['queen', 'apple']).tolist(), [3, 0])
+        self.assertEqual(word_id(vocabulary, 'king'), 2)
+
+    def test_word_id_missing_word(self):
+        vocabulary = build_vocabulary(self.words)
+        with self.assertRaises(KeyError):
+            word_id(vocabulary, 'cherry')
+        with self.assertRaises(KeyError):
+            word_id(vocabulary, 'zebra')
+
+    def test_vocabulary_fingerprint(self):
+        vocabulary = build_vocabulary(self.words)
+        self.assertEqual(vocabulary_fingerprint(vocabulary), vocabulary_fingerprint(build_vocabulary(reversed(self.words))))
+        self.assertNotEqual(vocabulary_fingerprint(vocabulary), vocabulary_fingerprint(build_vocabulary(self.words[:2])))
+
+    def test_save_and_load_vocabulary(self):
+        vocabulary = build_vocabulary(self.words)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            vocabulary_path = os.path.join(tmp_dir, 'vocabulary.txt')
+            save_vocabulary(vocabulary, vocabulary_path)
+            loaded_vocabulary = load_vocabulary(vocabulary_path)
+        np.testing.assert_array_equal(loaded_vocabulary, vocabulary)
+        self.assertEqual(vocabulary_fingerprint(loaded_vocabulary), vocabulary_fingerprint(vocabulary))
+
+    def test_embeddings_to_matrix(self):
+        embeddings = {
+            'word2': np.array([0.4, 0.5, 0.6]),
+            'word1': np.array([0.1, 0.2, 0.3]),
+        }
+        vocabulary, matrix = embeddings_to_matrix(embeddings)
+        self.assertEqual(vocabulary.tolist(), ['word1', 'word2'])
+        for word, vector in embeddings.items():
+            np.testing.assert_array_almost_equal(matrix[word_id(vocabulary, word)], vector)
+
+    def test_load_encrypted_embeddings_by_id(self):
+        embeddings = {word: np.array([0.1, 0.2, float(i)]) for i, word in enumerate(build_vocabulary(self.words))}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            encrypted_data_path = os.path.join(tmp_dir, 'encrypted_vectors.bin')
+            create_contexts(context_dir=tmp_dir, scheme=SCHEME_BFV, poly_modulus_degree=4096)
+            encrypt_embeddings(embeddings, os.path.join(tmp_dir, 'context_public.bin'), encrypted_data_path, vocabulary_path=None)
+
+            self.assertEqual(sorted(load_encrypted_embeddings_bytes(encrypted_data_path)), [0, 1, 2, 3])
+            self.assertEqual(sorted(load_encrypted_embeddings_bytes(encrypted_data_path, ids=np.array([3, 1]))), [1, 3])
+
+            # Out-of-range IDs, negative ones included, are named rather than wrapped around
+            with self.assertRaises(KeyError) as cm:
+                load_encrypted_embeddings_bytes(encrypted_data_path, ids=[1, -1, 4])
+            self.assertIn('[-1, 4]', str(cm.exception))
+
+            # Batches cover the store once, in ID order
+            batches = list(iter_encrypted_embeddings_bytes(encrypted_data_path, batch_size=3))
+            self.assertEqual([sorted(batch) for batch in batches], [[0, 1, 2], [3]])
+            all_words = load_encrypted_embeddings_bytes(encrypted_data_path)
+            for batch in batches:
+                for stored_id, enc_data in batch.items():
+                    self.assertEqual(enc_data, all_words[stored_id])
+
+            # Stores written before the index hold one body pickle, and still load
+            legacy_data_path = os.path.join(tmp_dir, 'legacy_vectors.bin')
+            with open(legacy_data_path, 'wb') as f:
+                pickle.dump({'vocabulary_fingerprint': None, 'store_fingerprint': None, 'size': len(all_words)}, f)
+                pickle.dump({
+                    'encrypted_vectors': [all_words[i]['encrypted_vector'] for i in range(len(all_words))],
+                    'encrypted_inv_norms': [all_words[i]['encrypted_inv_norm'] for i in range(len(all_words))]
+                }, f)
+            self.assertEqual(load_encrypted_embeddings_bytes(legacy_data_path, ids=[3, 1]), {1: all_words[1], 3: all_words[3]})
+            self.assertEqual(list(iter_encrypted_embeddings_bytes(legacy_data_path, batch_size=3)), batches)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# tiered_search.py
+# Two-tier variant of compute.py and display_results.py. A small, low-precision
+# coarse tier scores the whole vocabulary on reduced-dimension embeddings, and
+# only the top candidates are rescored with the full-precision store created
+# by main.py. Run main.py first. Finally, the recall of the two-tier search is
+# benchmarked against a full-precision scan.
+
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from vector_database.benchmark import benchmark_tiered_search
+from vector_database.data_loader import load_word_embeddings
+from vector_database.display import load_encrypted_results, decrypt_results, top_k
+from vector_database.tiered import (
+    create_coarse_tier,
+    encrypt_coarse_query,
+    coarse_scan,
+    select_candidates,
+    rerank_candidates,
+)
+from vector_database.vocabulary import load_vocabulary
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = 'data'
+coarse_dir = os.path.join(script_dir, data_dir, 'coarse')
+
+
+def main():
+    query_word = 'king'
+    coarse_dimensions = 8
+    num_candidates = 5
+    k = 3
+
+    # Start timer
+    start_time = time.time()
+
+    # Load embeddings
+    print("Loading embeddings...")
+    embeddings = load_word_embeddings(os.path.join(script_dir, data_dir, 'word_embeddings.txt'))
+
+    # Data owner: build the coarse tier and encrypt the coarse query
+    print("Creating coarse tier...")
+    create_coarse_tier(embeddings, coarse_dir=coarse_dir, coarse_dimensions=coarse_dimensions)
+    print(f"Encrypting coarse query word '{query_word}'...")
+    encrypt_coarse_query(query_word, embeddings, coarse_dir=coarse_dir)
+
+    # Server: coarse scan of the whole vocabulary
+    print("Computing coarse encrypted similarities...")
+    coarse_scan(coarse_dir=coarse_dir)
+
+    # Client: pick the candidates
+    print("Selecting candidates...")
+    candidates = select_candidates(coarse_dir=coarse_dir, num_candidates=num_candidates)
+
+    # Server: rerank the candidates with the full-precision store
+    print(f"Reranking {len(candidates)} candidates with full precision...")
+    rerank_candidates(
+        candidates,
+        encrypted_data_path=os.path.join(script_dir, data_dir, 'encrypted_vectors.bin'),
+        encrypted_query_path=os.path.join(script_dir, data_dir, 'encrypted_query.bin'),
+        context_public_path=os.path.join(script_dir, data_dir, 'context_public.bin'),
+        results_path=os.path.join(script_dir, data_dir, 'encrypted_results.bin'),
+        coarse_dir=coarse_dir
+    )
+
+    # Client: decrypt the reranked results
+    vocabulary = load_vocabulary(os.path.join(script_dir, data_dir, 'vocabulary.txt'))
+    encrypted_results, _ = load_encrypted_results(
+        results_path=os.path.join(script_dir, data_dir, 'encrypted_results.bin'),
+        context_private_path=os.path.join(script_dir, data_dir, 'context_private.bin'),
+        vocabulary=vocabulary
+    )
+    decrypted_results = decrypt_results(encrypted_results)
+    print(f"\nTop {k} results:")
+    for result_id in top_k(decrypted_results, k):
+        print(f"Word: {vocabulary[result_id]}")
+        print(f"  Decrypted Cosine Similarity: {decrypted_results[result_id]}")
+
+    print(f"\nTwo-tier search completed in {time.time() - start_time:.2f} seconds.")
+
+    # Benchmark recall against a full-precision scan
+    print("\nBenchmarking two-tier search against a full scan...")
+    report = benchmark_tiered_search(
+        embeddings, query_word, k=k, num_candidates=num_candidates, coarse_dimensions=coarse_dimensions
+    )
+    print(f"  Words: {report['num_words']}, candidates: {report['num_candidates']}, coarse dimensions: {report['coarse_dimensions']}")
+    print(f"  Full scan: {report['full_seconds']:.2f} seconds")
+    print(f"  Two-tier search: {report['tiered_seconds']:.2f} seconds "
+          f"(coarse {report['coarse_seconds']:.2f}, rerank {report['rerank_seconds']:.2f})")
+    print(f"  Recall@{k} against the full scan: {report['recall']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+# vector_database/benchmark.py
+
+import time
+import numpy as np
+
+from vector_database.computation import compute_encrypted_cosine_similarities
+from vector_database.display import compute_plaintext_similarities, top_k
+from vector_database.schemes import SCHEME_CKKS, SCHEME_BFV, new_context, encrypt_embedding, decrypt_similarity
+from vector_database.tiered import (
+    COARSE_POLY_MODULUS_DEGREE,
+    COARSE_COEFF_MOD_BIT_SIZES,
+    DEFAULT_COARSE_DIMENSIONS,
+    DEFAULT_NUM_CANDIDATES,
+    fit_coarse_projection,
+    project_embeddings,
+)
+
+
+def ranking_agreement(results, reference_results, k=10):
+    """
+    Measures how closely a ranking agrees with a reference ranking.
+
+    Args:
+        results (dict): Dictionary of words to similarity values being evaluated.
+        reference_results (dict): Dictionary of words to reference similarity values.
+        k (int): Number of top words compared for the overlap.
+
+    Returns:
+        dict: The top-k overlap (fraction of shared top-k words) and the
+        Spearman rank correlation over all shared words.
+    """
+    words = [word for word in reference_results if word in results]
+    k = min(k, len(words))
+
+    top_k_overlap = len(set(top_k(results, k)) & set(top_k(reference_results, k))) / k if k else 1.0
+
+    # Spearman correlation is the Pearson correlation of the ranks
+    ranks = np.argsort(np.argsort([results[word] for word in words]))
+    reference_ranks = np.argsort(np.argsort([reference_results[word] for word in words]))
+    if len(words) > 1:
+        spearman = float(np.corrcoef(ranks, reference_ranks)[0, 1])
+    else:
+        spearman = 1.0
+
+    return {
+        'top_k_overlap': top_k_overlap,
+        'spearman': spearman,
+    }
+
+
+def benchmark_scheme(embeddings, query_word, scheme, poly_modulus_degree=None):
+    """
+    Runs the encrypt, compute and decrypt pipeline in memory for one scheme and times it.
+
+    Args:
+        embeddings (dict): Dictionary of word embeddings.
+        query_word (str): The query word.
+        scheme (str): Either 'ckks' or 'bfv'.
+        poly_modulus_degree (int, optional): The degree of the polynomial modulus. Uses the scheme default if None.
+
+    Returns:
+        dict: Timings, throughput, serialized ciphertext size per word and the decrypted results.
+    """
+    context = new_context(scheme, poly_modulus_degree=poly_modulus_degree)
+
+    # Encrypt the store
+    start_time = time.time()
+    encrypted_embeddings = {}
+    ciphertext_bytes = 0
+    for word, vector in embeddings.items():
+        encrypted_vector, encrypted_inv_norm = encrypt_embedding(context, vector)
+        ciphertext_bytes += len(encrypted_vector.serialize())
+        if encrypted_inv_norm is not None:
+            ciphertext_bytes += len(encrypted_inv_norm.serialize())
+        encrypted_embeddings[word] = {
+            'encrypted_vector': encrypted_vector,
+            'encrypted_inv_norm': encrypted_inv_norm
+        }
+    encrypt_seconds = time.time() - start_time
+
+    encrypted_query_vector, encrypted_query_inv_norm = encrypt_embedding(context, embeddings[query_word])
+
+    # Score the store
+    start_time = time.time()
+    encrypted_results = compute_encrypted_cosine_similarities(
+        encrypted_query_vector, encrypted_query_inv_norm, encrypted_embeddings
+    )
+    compute_seconds = time.time() - start_time
+
+    decrypted_results = {word: decrypt_similarity(enc_value) for word, enc_value in encrypted_results.items()}
+
+    return {
+        'scheme': scheme,
+        'poly_modulus_degree': context.data.seal_context().first_context_data().parms().poly_modulus_degree(),
+        'encrypt_seconds': encrypt_seconds,
+        'compute_seconds': compute_seconds,
+        'words_per_second': len(embeddings) / compute_seconds if compute_seconds else float('inf'),
+        'bytes_per_word': ciphertext_bytes / len(embeddings),
+        'decrypted_results': decrypted_results,
+    }
+
+
+def compare_schemes(embeddings, query_word, k=10, schemes=(SCHEME_CKKS, SCHEME_BFV)):
+    """
+    Benchmarks each scheme and measures its ranking agreement with the plaintext similarities.
+
+    Args:
+        embeddings (dict): Dictionary of word embeddings.
+        query_word (str): The query word.
+        k (int): Number of top words compared for the overlap.
+        schemes (tuple): The schemes to benchmark.
+
+    Returns:
+        list: One report per scheme, as returned by benchmark_scheme, with an added 'agreement' entry.
+    """
+    plaintext_results = compute_plaintext_similarities(embeddings, embeddings[query_word])
+
+    reports = []
+    for scheme in schemes:
+        report = benchmark_scheme(embeddings, query_word, scheme)
+        report['agreement'] = ranking_agreement(report['decrypted_results'], plaintext_results, k=k)
+        reports.append(report)
+
+    return reports
+
+
+def _encrypt_store(context, embeddings, unit_norm=False):
+    """
+    Encrypts embeddings in memory in the layout used by compute_encrypted_cosine_similarities.
+    """
+    encrypted_embeddings = {}
+    for word, vector in embeddings.items():
+        encrypted_vector, encrypted_inv_norm = encrypt_embedding(context, vector, unit_norm=unit_norm)
+        encrypted_embeddings[word] = {
+            'encrypted_vector': encrypted_vector,
+            'encrypted_inv_norm': encrypted_inv_norm
+        }
+    return encrypted_embeddings
+
+
+def benchmark_tiered_search(embeddings, query_word, k=10, num_candidates=DEFAULT_NUM_CANDIDATES, coarse_dimensions=DEFAULT_COARSE_DIMENSIONS, poly_modulus_degree=None):
+    """
+    Compares the two-tier coarse-then-rerank search against a full-precision scan in memory.
+
+    Args:
+        embeddings (dict): Dictionary of word embeddings.
+        query_word (str): The query word.
+        k (int): Number of top words returned by each search.
+        num_candidates (int): Number of coarse candidates reranked with full precision.
+        coarse_dimensions (int, optional): Number of dimensions kept by the coarse tier. Keeps all if None.
+        poly_modulus_degree (int, optional): The degree of the polynomial modulus of the full tier.
+
+    Returns:
+        dict: Timings of both searches, their top-k words, and the recall of the
+        two-tier search against the full scan.
+    """
+    full_context = new_context(SCHEME_CKKS, poly_modulus_degree=poly_modulus_degree)
+    coarse_context = new_context(
+        SCHEME_CKKS,
+        poly_modulus_degree=COARSE_POLY_MODULUS_DEGREE,
+        coeff_mod_bit_sizes=COARSE_COEFF_MOD_BIT_SIZES,
+    )
+
+    projection = fit_coarse_projection(embeddings, coarse_dimensions)
+    coarse_embeddings = project_embeddings(embeddings, projection)
+
+    full_store = _encrypt_store(full_context, embeddings)
+    coarse_store = _encrypt_store(coarse_context, coarse_embeddings, unit_norm=True)
+    full_query = encrypt_embedding(full_context, embeddings[query_word])
+    coarse_query = encrypt_embedding(coarse_context, coarse_embeddings[query_word], unit_norm=True)
+
+    # Full-precision scan of the whole vocabulary
+    start_time = time.time()
+    full_results = compute_encrypted_cosine_similarities(*full_query, full_store)
+    full_top_k = top_k({word: decrypt_similarity(enc_value) for word, enc_value in full_results.items()}, k)
+    full_seconds = time.time() - start_time
+
+    # Coarse scan of the whole vocabulary, then full-precision rerank of the candidates
+    start_time = time.time()
+    coarse_results = compute_encrypted_cosine_similarities(*coarse_query, coarse_store)
+    candidates = top_k({word: decrypt_similarity(enc_value) for word, enc_value in coarse_results.items()}, num_candidates)
+    coarse_seconds = time.time() - start_time
+
+    start_time = time.time()
+    reranked_results = compute_encrypted_cosine_similarities(
+        *full_query, {word: full_store[word] for word in candidates}
+    )
+    tiered_top_k = top_k({word: decrypt_similarity(enc_value) for word, enc_value in reranked_results.items()}, k)
+    rerank_seconds = time.time() - start_time
+
+    return {
+        'num_words': len(embeddings),
+        'num_candidates': len(candidates),
+        'coarse_dimensions': coarse_embeddings[query_word].shape[0],
+        'full_seconds': full_seconds,
+        'coarse_seconds': coarse_seconds,
+        'rerank_seconds': rerank_seconds,
+        'tiered_seconds': coarse_seconds + rerank_seconds,
+        'full_top_k': full_top_k,
+        'tiered_top_k': tiered_top_k,
+        'recall': len(set(full_top_k) & set(tiered_top_k)) / len(full_top_k) if full_top_k else 1.0,
+    }
@@ -0,0 +1,173 @@
+# vector_database/cache.py
+
+import os
+import pickle
+import tempfile
+import time
+from collections import OrderedDict
+
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 60 * 60
+
+
+class ResultCache:
+    """
+    Client-side cache of decrypted top-k results, persisted to a file so that separate processes share it.
+
+    Entries are keyed by query word and tagged with the fingerprint of the
+    encrypted store they were computed against. A lookup with a different
+    fingerprint means the store has changed, so every entry computed against
+    an older store is dropped. Entries also expire after ttl_seconds, and the
+    least recently used entries are evicted beyond max_entries. A hit does not
+    rewrite the file: the instance remembers it and moves the entry up when it
+    next writes the file. The file holds decrypted results, so it belongs
+    with the client's private context.
+
+    Args:
+        cache_path (str): Path to the cache file.
+        max_entries (int): Maximum number of cached queries.
+        ttl_seconds (float): Time after which a cached result expires.
+    """
+
+    def __init__(self, cache_path='data/result_cache.pkl', max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._pending_hits = OrderedDict()
+
+    def get(self, query_word, store_fingerprint, k):
+        """
+        Looks up the top k results of a query against the current store.
+
+        Args:
+            query_word (str): The query word.
+            store_fingerprint (str): Fingerprint of the current encrypted store.
+            k (int): Number of results wanted.
+
+        Returns:
+            list: The top k (word ID, similarity) pairs, highest similarity first, or None on a miss.
+        """
+        entries = self._load()
+        changed = self._invalidate(entries, store_fingerprint)
+
+        entry = entries.get(query_word)
+        if entry is None or entry['k'] < k:
+            self.misses += 1
+            if changed:
+                self._apply_pending_hits(entries)
+                self._save(entries)
+            return None
+
+        self.hits += 1
+        self._pending_hits.pop(query_word, None)
+        self._pending_hits[query_word] = None
+        if changed:
+            self._apply_pending_hits(entries)
+            self._save(entries)
+        return entry['results'][:k]
+
+    def put(self, query_word, store_fingerprint, results, k):
+        """
+        Caches the top k results of a query.
+
+        Args:
+            query_word (str): The query word.
+            store_fingerprint (str): Fingerprint of the encrypted store the results were computed against.
+            results (list): The top k (word ID, similarity) pairs, highest similarity first.
+            k (int): Number of results asked for. Fewer results mean the store has fewer than k words.
+
+        Returns:
+            None
+        """
+        entries = self._load()
+        self._invalidate(entries, store_fingerprint)
+        self._apply_pending_hits(entries)
+
+        entries[query_word] = {
+            'store_fingerprint': store_fingerprint,
+            'results': [(int(word_id), float(similarity)) for word_id, similarity in results],
+            'k': k,
+            'created': time.time(),
+        }
+        entries.move_to_end(query_word)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+        self._save(entries)
+
+    def clear(self):
+        """
+        Removes every cached result.
+
+        Returns:
+            None
+        """
+        if os.path.exists(self.cache_path):
+            os.remove(self.cache_path)
+
+    def stats(self):
+        """
+        Reports this instance's hit and miss counters and the number of cached queries.
+
+        Returns:
+            dict: Hits, misses and entries.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._load())}
+
+    def _invalidate(self, entries, store_fingerprint):
+        """
+        Drops entries computed against another store or past their TTL. Returns whether any were dropped.
+        """
+        now = time.time()
+        stale = [
+            query_word for query_word, entry in entries.items()
+            if entry['store_fingerprint'] != store_fingerprint or now - entry['created'] > self.ttl_seconds
+        ]
+        for query_word in stale:
+            del entries[query_word]
+        return bool(stale)
+
+    def _apply_pending_hits(self, entries):
+        """
+        Moves the entries hit since the file was last written to the most recently used end, in the order they were hit.
+        """
+        for query_word in self._pending_hits:
+            if query_word in entries:
+                entries.move_to_end(query_word)
+
+    def _load(self):
+        """
+        Loads the entries from the cache file, in least recently used order.
+        """
+        if not os.path.exists(self.cache_path):
+            return OrderedDict()
+        with open(self.cache_path, 'rb') as f:
+            return pickle.load(f)
+
+    def _save(self, entries):
+        """
+        Saves the entries, replacing the cache file atomically so concurrent readers never see a partial file.
+
+        Each write goes through its own temporary file, so concurrent writers
+        in any process or thread never share one. Call _apply_pending_hits on
+        the entries first, since the pending hits are cleared once saved.
+        """
+        cache_dir = os.path.dirname(self.cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        with tempfile.NamedTemporaryFile(
+            'wb', dir=cache_dir or '.', prefix=f"{os.path.basename(self.cache_path)}.", suffix='.tmp', delete=False
+        ) as f:
+            tmp_path = f.name
+            try:
+                pickle.dump(entries, f)
+            except BaseException:
+                f.close()
+                os.remove(tmp_path)
+                raise
+        os.replace(tmp_path, self.cache_path)
+        self._pending_hits.clear()
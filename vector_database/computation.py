@@ -1,20 +1,29 @@
 # vector_database/computation.py
 
 import tenseal as ts
+import numpy as np
 import os
 import pickle
 
+from vector_database.schemes import vector_from, vector_from_bytes, vector_to_bytes
 
-def load_encrypted_embeddings(encrypted_data_path='data/encrypted_vectors.bin', context_public_path='data/context_public.bin'):
+
+# Kernel modes for encrypted_cosine_similarity
+SCHEDULE_AUTO = 'auto'
+SCHEDULE_MANUAL = 'manual'
+
+
+def load_encrypted_embeddings(encrypted_data_path='data/encrypted_vectors.bin', context_public_path='data/context_public.bin', ids=None):
     """
     Loads the encrypted embeddings and inverse norms from file.
 
     Args:
         encrypted_data_path (str): Path to the encrypted embeddings file.
         context_public_path (str): Path to the public context file.
+        ids (iterable, optional): Only deserialize the words with these integer IDs. Loads all words if None.
 
     Returns:
-        dict: A dictionary mapping words to encrypted vectors and inverse norms.
+        dict: A dictionary mapping word IDs to encrypted vectors and inverse norms.
         ts.Context: The public TenSEAL context.
     """
     # Load public context
@@ -22,20 +31,174 @@ def load_encrypted_embeddings(encrypted_data_path='data/encrypted_vectors.bin',
         context = ts.context_from(f.read())
 
     # Load encrypted embeddings
+    encrypted_embeddings_bytes = load_encrypted_embeddings_bytes(encrypted_data_path, ids=ids)
+
+    encrypted_embeddings = deserialize_encrypted_embeddings(encrypted_embeddings_bytes, context)
+
+    return encrypted_embeddings, context
+
+
+def load_encrypted_store_header(encrypted_data_path='data/encrypted_vectors.bin'):
+    """
+    Loads only the header of the encrypted embeddings file.
+
+    Args:
+        encrypted_data_path (str): Path to the encrypted embeddings file.
+
+    Returns:
+        dict: The vocabulary fingerprint, the store fingerprint, the number of words in the store,
+            whether its ciphertexts are seeded and whether its records are indexed.
+    """
+    with open(encrypted_data_path, 'rb') as f:
+        header = pickle.load(f)
+    # Stores written before seeding hold expanded ciphertexts, and those written before the index one body pickle
+    header.setdefault('seeded', False)
+    header.setdefault('indexed', False)
+    return header
+
+
+def load_encrypted_embeddings_bytes(encrypted_data_path='data/encrypted_vectors.bin', ids=None):
+    """
+    Loads the serialized encrypted embeddings and inverse norms from file, without deserializing them.
+
+    Only the records of the requested words are read from the file.
+
+    Args:
+        encrypted_data_path (str): Path to the encrypted embeddings file.
+        ids (iterable, optional): Only return the words with these integer IDs. Returns all words if None.
+
+    Returns:
+        dict: A dictionary mapping word IDs to serialized encrypted vectors and inverse norms.
+
+    Raises:
+        KeyError: If an ID is not in the store.
+    """
+    with open(encrypted_data_path, 'rb') as f:
+        header = pickle.load(f)
+
+        if ids is None:
+            ids = range(header['size'])
+        else:
+            # Check against the header first, so a bad ID fails before the body is read
+            ids = [int(word_id) for word_id in ids]
+            missing = [word_id for word_id in ids if not 0 <= word_id < header['size']]
+            if missing:
+                raise KeyError(f"Word IDs not in the encrypted store of {header['size']} words: {missing[:5]}")
+
+        return _encrypted_record_reader(f, header)(ids)
+
+
+def iter_encrypted_embeddings_bytes(encrypted_data_path='data/encrypted_vectors.bin', batch_size=64):
+    """
+    Loads the serialized encrypted embeddings and inverse norms from file in batches of consecutive word IDs.
+
+    Each batch is read from the file only when it is asked for, so a caller
+    that lets go of a batch before asking for the next one holds a single
+    batch of the store in memory.
+
+    Args:
+        encrypted_data_path (str): Path to the encrypted embeddings file.
+        batch_size (int): The number of words per batch.
+
+    Yields:
+        dict: A dictionary mapping word IDs to serialized encrypted vectors and inverse norms.
+    """
     with open(encrypted_data_path, 'rb') as f:
-        encrypted_embeddings_bytes = pickle.load(f)
+        header = pickle.load(f)
+        read_records = _encrypted_record_reader(f, header)
+
+        for start in range(0, header['size'], batch_size):
+            yield read_records(range(start, min(start + batch_size, header['size'])))
+
+
+def _encrypted_record_reader(f, header):
+    """
+    Returns a function reading the serialized records of the given word IDs from a store file opened past its header.
 
-    # Deserialize encrypted embeddings and inverse norms
+    Stores written before the index hold a single body pickle, which is loaded whole here.
+    """
+    if not header.get('indexed', False):
+        store = pickle.load(f)
+        encrypted_vectors = store['encrypted_vectors']
+        encrypted_inv_norms = store['encrypted_inv_norms']
+
+        def read_records(ids):
+            return {
+                word_id: {
+                    'encrypted_vector': encrypted_vectors[word_id],
+                    'encrypted_inv_norm': encrypted_inv_norms[word_id]
+                }
+                for word_id in ids
+            }
+
+        return read_records
+
+    index = pickle.load(f)
+    records_start = f.tell()
+    offsets = index['offsets']
+    vector_lengths = index['vector_lengths']
+
+    def read_records(ids):
+        records = {}
+        for word_id in ids:
+            f.seek(records_start + offsets[word_id])
+            encrypted_vector = f.read(vector_lengths[word_id])
+            inv_norm_length = offsets[word_id + 1] - offsets[word_id] - vector_lengths[word_id]
+            records[word_id] = {
+                'encrypted_vector': encrypted_vector,
+                'encrypted_inv_norm': f.read(inv_norm_length) if inv_norm_length else None
+            }
+        return records
+
+    return read_records
+
+
+def deserialize_encrypted_embeddings(encrypted_embeddings_bytes, context):
+    """
+    Deserializes encrypted embeddings and inverse norms against a context.
+
+    Seeded ciphertexts from a store the data owner encrypted with the secret
+    key are expanded here: SEAL regenerates their random half as it loads them.
+    Until then, as in load_encrypted_embeddings_bytes, they stay half size.
+
+    Args:
+        encrypted_embeddings_bytes (dict): Dictionary mapping word IDs to serialized encrypted vectors and inverse norms.
+        context (ts.Context): The TenSEAL context to link the ciphertexts to.
+
+    Returns:
+        dict: A dictionary mapping word IDs to encrypted vectors and inverse norms.
+    """
     encrypted_embeddings = {}
-    for word, enc_data in encrypted_embeddings_bytes.items():
-        encrypted_vector = ts.ckks_vector_from(context, enc_data['encrypted_vector'])
-        encrypted_inv_norm = ts.ckks_vector_from(context, enc_data['encrypted_inv_norm'])
-        encrypted_embeddings[word] = {
+    for word_id, enc_data in encrypted_embeddings_bytes.items():
+        encrypted_vector = vector_from(context, enc_data['encrypted_vector'])
+        encrypted_inv_norm = vector_from(context, enc_data['encrypted_inv_norm'])
+        encrypted_embeddings[word_id] = {
             'encrypted_vector': encrypted_vector,
             'encrypted_inv_norm': encrypted_inv_norm
         }
 
-    return encrypted_embeddings, context
+    return encrypted_embeddings
+
+
+def serialize_encrypted_embeddings(encrypted_embeddings):
+    """
+    Serializes encrypted embeddings and inverse norms back to bytes.
+
+    Args:
+        encrypted_embeddings (dict): Dictionary of encrypted embeddings and inverse norms.
+
+    Returns:
+        dict: A dictionary mapping word IDs to serialized encrypted vectors and inverse norms.
+    """
+    encrypted_embeddings_bytes = {}
+    for word_id, enc_data in encrypted_embeddings.items():
+        enc_inv_norm = enc_data['encrypted_inv_norm']
+        encrypted_embeddings_bytes[word_id] = {
+            'encrypted_vector': enc_data['encrypted_vector'].serialize(),
+            'encrypted_inv_norm': enc_inv_norm.serialize() if enc_inv_norm is not None else None
+        }
+
+    return encrypted_embeddings_bytes
 
 
 def load_encrypted_query(encrypted_query_path='data/encrypted_query.bin', context_public_path='data/context_public.bin'):
@@ -47,7 +210,7 @@ def load_encrypted_query(encrypted_query_path='data/encrypted_query.bin', contex
         context_public_path (str): Path to the public context file.
 
     Returns:
-        tuple: The encrypted query vector and encrypted inverse norm.
+        tuple: The encrypted query vector and encrypted inverse norm (None under BFV).
     """
     # Load public context
     with open(context_public_path, 'rb') as f:
@@ -57,13 +220,43 @@ def load_encrypted_query(encrypted_query_path='data/encrypted_query.bin', contex
     with open(encrypted_query_path, 'rb') as f:
         encrypted_query_data = pickle.load(f)
 
-    # Deserialize encrypted query vector and inverse norm
-    encrypted_query_vector = ts.ckks_vector_from(context, encrypted_query_data['encrypted_query_vector'])
-    encrypted_query_inv_norm = ts.ckks_vector_from(context, encrypted_query_data['encrypted_query_inv_norm'])
+    return deserialize_encrypted_query(encrypted_query_data, context)
+
+
+def deserialize_encrypted_query(encrypted_query_data, context):
+    """
+    Deserializes the encrypted query vector and inverse norm against a context.
+
+    Args:
+        encrypted_query_data (dict): The serialized encrypted query vector and inverse norm.
+        context (ts.Context): The TenSEAL context to link the ciphertexts to.
+
+    Returns:
+        tuple: The encrypted query vector and encrypted inverse norm (None under BFV).
+    """
+    encrypted_query_vector = vector_from(context, encrypted_query_data['encrypted_query_vector'])
+    encrypted_query_inv_norm = vector_from(context, encrypted_query_data['encrypted_query_inv_norm'])
 
     return encrypted_query_vector, encrypted_query_inv_norm
 
 
+def encrypted_dot_product(encrypted_vector_A, encrypted_vector_B):
+    """
+    Computes the dot product between two encrypted vectors using homomorphic encryption.
+
+    Under BFV the vectors are quantized to unit length, so this is already the
+    (scaled) cosine similarity.
+
+    Args:
+        encrypted_vector_A (CKKSVector or BFVVector): The first encrypted vector.
+        encrypted_vector_B (CKKSVector or BFVVector): The second encrypted vector.
+
+    Returns:
+        CKKSVector or BFVVector: The encrypted dot product.
+    """
+    return (encrypted_vector_A * encrypted_vector_B).sum()
+
+
 def encrypted_cosine_similarity(encrypted_vector_A, encrypted_vector_B, encrypted_inv_norm_A, encrypted_inv_norm_B):
     """
     Computes the cosine similarity between two encrypted vectors using homomorphic encryption.
@@ -78,61 +271,199 @@ def encrypted_cosine_similarity(encrypted_vector_A, encrypted_vector_B, encrypte
         CKKSVector: The encrypted cosine similarity.
     """
     # Compute the dot product
-    encrypted_dot_product = (encrypted_vector_A * encrypted_vector_B).sum()
+    encrypted_dot = encrypted_dot_product(encrypted_vector_A, encrypted_vector_B)
 
-    # Calculate the cosine similarity
-    encrypted_cosine_similarity = encrypted_dot_product * encrypted_inv_norm_A * encrypted_inv_norm_B
+    # Calculate the cosine similarity. TenSEAL switches the right operand down
+    # in place when it is at a higher level, so the inverse norms go on the
+    # left and keep their level for later queries, whichever kernel they use.
+    encrypted_cosine_similarity = encrypted_inv_norm_B * (encrypted_inv_norm_A * encrypted_dot)
 
     return encrypted_cosine_similarity
 
 
-def compute_encrypted_cosine_similarities(encrypted_query_vector, encrypted_query_inv_norm, encrypted_embeddings):
+# Primes the normalized query keeps: one for each of the two rescales per
+# word in the manual kernel, and the last one for decrypting the result
+_NORMALIZED_QUERY_PRIMES = 3
+
+
+def normalize_encrypted_query(encrypted_query_vector, encrypted_query_inv_norm):
     """
-    Computes cosine similarities between the encrypted query and encrypted embeddings using pre-encrypted inverse norms.
+    Multiplies the encrypted query by its encrypted inverse norm, once per query.
+
+    TenSEAL encrypts a vector replicated across all the slots, so the inverse
+    norm already holds its value in every slot. It is re-declared at the
+    query's size, which makes the product a single multiplication instead of
+    TenSEAL's broadcast of a one-value vector (a rotation and a second
+    multiplication). The product is then rescaled down to the last three
+    primes of the modulus chain by multiplying it by 1.0, since the per-word
+    work of encrypted_cosine_similarity_normalized needs no more.
 
     Args:
         encrypted_query_vector (CKKSVector): The encrypted query vector.
         encrypted_query_inv_norm (CKKSVector): The encrypted inverse norm of the query vector.
+
+    Returns:
+        CKKSVector: The encrypted unit-length query.
+    """
+    ciphertexts, _, scale = vector_from_bytes(encrypted_query_inv_norm.serialize())
+    encrypted_query_inv_norm = vector_from(
+        encrypted_query_vector.context(),
+        vector_to_bytes(ciphertexts, [encrypted_query_vector.size()], scale=scale),
+    )
+
+    encrypted_normalized_query = encrypted_query_vector * encrypted_query_inv_norm
+    while _prime_count(encrypted_normalized_query) > _NORMALIZED_QUERY_PRIMES:
+        encrypted_normalized_query = encrypted_normalized_query * 1.0
+    return encrypted_normalized_query
+
+
+def _prime_count(encrypted_vector):
+    """
+    Returns the number of primes left in the modulus of a CKKS vector's ciphertexts.
+    """
+    return encrypted_vector.data.ciphertext()[0].coeff_modulus_size()
+
+
+def encrypted_cosine_similarity_normalized(encrypted_normalized_query, encrypted_vector, encrypted_inv_norm):
+    """
+    Computes the encrypted cosine similarity of a stored vector against a normalized query.
+
+    Args:
+        encrypted_normalized_query (CKKSVector): The query from normalize_encrypted_query.
+        encrypted_vector (CKKSVector): The stored encrypted vector.
+        encrypted_inv_norm (CKKSVector): The encrypted inverse norm of the stored vector.
+
+    Returns:
+        CKKSVector: The encrypted cosine similarity.
+    """
+    # The stored operands go on the left, so TenSEAL switches the query down
+    # to their level rather than switching them down in place
+    return encrypted_inv_norm * (encrypted_vector * encrypted_normalized_query).sum()
+
+
+def encrypted_cosine_similarity_manual(encrypted_vector_A, encrypted_vector_B, encrypted_inv_norm_A, encrypted_inv_norm_B):
+    """
+    Computes the encrypted cosine similarity with the query normalized up front.
+
+    The automatic kernel does three multiplications per word, each relinearized
+    and rescaled, and runs the rotations of sum() with the whole modulus chain.
+    This kernel multiplies vector A by its inverse norm once and drops it to
+    the last three primes (normalize_encrypted_query), so each word costs two
+    multiplications, and its product and rotations run on three primes instead
+    of the full chain. compute_encrypted_cosine_similarities normalizes the
+    query once for the whole store.
+
+    Measured on 300-dimension vectors, per word with the query normalized
+    once: about 350 ms against 700 ms at the default 32768 degree, where each
+    result also ends one prime lower, 524 KB serialized against 920 KB; and
+    about 160 ms against 290 ms at 16384 degree with [60, 40, 40, 40, 60]
+    bits, where both kernels end on the last prime and the results are the
+    same size.
+
+    Args:
+        encrypted_vector_A (CKKSVector): The first encrypted vector, usually the query.
+        encrypted_vector_B (CKKSVector): The second encrypted vector.
+        encrypted_inv_norm_A (CKKSVector): The encrypted inverse norm of vector A.
+        encrypted_inv_norm_B (CKKSVector): The encrypted inverse norm of vector B.
+
+    Returns:
+        CKKSVector: The encrypted cosine similarity.
+    """
+    encrypted_normalized_A = normalize_encrypted_query(encrypted_vector_A, encrypted_inv_norm_A)
+    return encrypted_cosine_similarity_normalized(encrypted_normalized_A, encrypted_vector_B, encrypted_inv_norm_B)
+
+
+def compute_encrypted_cosine_similarities(encrypted_query_vector, encrypted_query_inv_norm, encrypted_embeddings, schedule=SCHEDULE_AUTO):
+    """
+    Computes cosine similarities between the encrypted query and encrypted embeddings using pre-encrypted inverse norms.
+
+    Embeddings without inverse norms (BFV, quantized to unit length) are scored by their dot product alone.
+
+    Args:
+        encrypted_query_vector (CKKSVector or BFVVector): The encrypted query vector.
+        encrypted_query_inv_norm (CKKSVector): The encrypted inverse norm of the query vector, or None under BFV.
         encrypted_embeddings (dict): Dictionary of encrypted embeddings and inverse norms.
+        schedule (str): 'auto' to use encrypted_cosine_similarity, or 'manual' to normalize
+            the query once and use encrypted_cosine_similarity_normalized (see encrypted_cosine_similarity_manual).
 
     Returns:
-        dict: A dictionary mapping words to encrypted cosine similarity values.
+        dict: A dictionary mapping word IDs to encrypted cosine similarity values.
     """
+    if schedule not in (SCHEDULE_AUTO, SCHEDULE_MANUAL):
+        raise ValueError(f"Unknown schedule '{schedule}'. Use '{SCHEDULE_AUTO}' or '{SCHEDULE_MANUAL}'.")
+
+    encrypted_normalized_query = None
+    if schedule == SCHEDULE_MANUAL and encrypted_query_inv_norm is not None:
+        encrypted_normalized_query = normalize_encrypted_query(encrypted_query_vector, encrypted_query_inv_norm)
+
     encrypted_cosine_similarities = {}
 
-    for word, enc_data in encrypted_embeddings.items():
+    for word_id, enc_data in encrypted_embeddings.items():
         enc_vector = enc_data['encrypted_vector']
         enc_inv_norm = enc_data['encrypted_inv_norm']
 
-        # Compute encrypted cosine similarity using pre-encrypted inverse norms
-        encrypted_cos_sim = encrypted_cosine_similarity(
-            encrypted_query_vector, enc_vector, encrypted_query_inv_norm, enc_inv_norm
-        )
+        if enc_inv_norm is None or encrypted_query_inv_norm is None:
+            encrypted_cos_sim = encrypted_dot_product(encrypted_query_vector, enc_vector)
+        elif encrypted_normalized_query is not None:
+            encrypted_cos_sim = encrypted_cosine_similarity_normalized(encrypted_normalized_query, enc_vector, enc_inv_norm)
+        else:
+            # Compute encrypted cosine similarity using pre-encrypted inverse norms
+            encrypted_cos_sim = encrypted_cosine_similarity(
+                encrypted_query_vector, enc_vector, encrypted_query_inv_norm, enc_inv_norm
+            )
 
-        encrypted_cosine_similarities[word] = encrypted_cos_sim
+        encrypted_cosine_similarities[word_id] = encrypted_cos_sim
 
     return encrypted_cosine_similarities
 
 
-def save_encrypted_results(encrypted_results, results_path='data/encrypted_results.bin'):
+def save_encrypted_results(encrypted_results, results_path='data/encrypted_results.bin', vocabulary_fingerprint=None, store_fingerprint=None):
     """
     Saves the encrypted results to a file.
 
     Args:
-        encrypted_results (dict): Dictionary of words to encrypted cosine similarity values.
+        encrypted_results (dict): Dictionary of word IDs to encrypted cosine similarity values.
         results_path (str): Path to save the encrypted results.
+        vocabulary_fingerprint (str, optional): Fingerprint of the vocabulary the IDs refer to.
+        store_fingerprint (str, optional): Fingerprint of the encrypted store the results were computed against.
 
     Returns:
         None
     """
     # Serialize encrypted results
     encrypted_results_bytes = {}
-    for word, enc_value in encrypted_results.items():
+    for word_id, enc_value in encrypted_results.items():
         enc_value_bytes = enc_value.serialize()
-        encrypted_results_bytes[word] = enc_value_bytes
+        encrypted_results_bytes[word_id] = enc_value_bytes
+
+    save_encrypted_results_bytes(encrypted_results_bytes, results_path, vocabulary_fingerprint, store_fingerprint)
+
+
+def save_encrypted_results_bytes(encrypted_results_bytes, results_path='data/encrypted_results.bin', vocabulary_fingerprint=None, store_fingerprint=None):
+    """
+    Saves already serialized encrypted results to a file.
+
+    Like the encrypted store, the file is a header pickle followed by a body
+    pickle, which holds the word IDs as an integer array and the serialized
+    results as a list in the same order.
+
+    Args:
+        encrypted_results_bytes (dict): Dictionary of word IDs to serialized encrypted cosine similarity values.
+        results_path (str): Path to save the encrypted results.
+        vocabulary_fingerprint (str, optional): Fingerprint of the vocabulary the IDs refer to.
+        store_fingerprint (str, optional): Fingerprint of the encrypted store the results were computed against.
+
+    Returns:
+        None
+    """
+    ids = np.fromiter(encrypted_results_bytes.keys(), dtype=np.int64, count=len(encrypted_results_bytes))
 
     # Save to file
     with open(results_path, 'wb') as f:
-        pickle.dump(encrypted_results_bytes, f)
+        pickle.dump({'vocabulary_fingerprint': vocabulary_fingerprint, 'store_fingerprint': store_fingerprint}, f)
+        pickle.dump({
+            'ids': ids,
+            'encrypted_results': list(encrypted_results_bytes.values())
+        }, f)
 
     print(f"Encrypted results saved to {results_path}")
@@ -3,6 +3,8 @@
 import os
 import numpy as np
 
+from vector_database.vocabulary import build_vocabulary
+
 
 def load_word_embeddings(filename, lines_desired=None):
     """
@@ -37,3 +39,79 @@ def load_word_embeddings(filename, lines_desired=None):
             vector = np.array([float(val) for val in vector_components], dtype=np.float32)
             embeddings[word] = vector
     return embeddings
+
+
+def load_embedding_matrix(filename, lines_desired=None):
+    """
+    Load word embeddings from a file into a vocabulary index and a matrix.
+
+    Row i of the matrix is the embedding of the word with ID i, so the words
+    are stored once and the vectors in one contiguous array. If a word appears
+    more than once, its last vector is kept, as in load_word_embeddings.
+
+    Args:
+        filename (str): The filename of the embeddings.
+        lines_desired (int, optional): Number of lines to read. Reads all lines if None.
+
+    Returns:
+        numpy.array: The sorted array of words (the vocabulary).
+        numpy.array: The (words, dimensions) float32 embedding matrix.
+    """
+    file_path = os.path.join('data', filename)
+
+    words = []
+    rows = []
+    with open(file_path, 'r') as file:
+        for line_number, line in enumerate(file):
+            if lines_desired is not None and line_number >= lines_desired:
+                break
+            parts = line.strip().split()
+            if not parts:
+                continue
+            words.append(parts[0])
+            rows.append(np.array([float(val) for val in parts[1:]], dtype=np.float32))
+
+    if not rows:
+        return build_vocabulary([]), np.empty((0, 0), dtype=np.float32)
+
+    # Keep the last occurrence of repeated words
+    last_row = {word: row for row, word in enumerate(words)}
+    vocabulary = build_vocabulary(last_row)
+    matrix = np.stack(rows)[[last_row[word] for word in vocabulary.tolist()]]
+    return vocabulary, matrix
+
+
+def embeddings_to_matrix(embeddings):
+    """
+    Converts a dictionary of word embeddings to a vocabulary index and a matrix.
+
+    Args:
+        embeddings (dict): Dictionary of word embeddings.
+
+    Returns:
+        numpy.array: The sorted array of words (the vocabulary).
+        numpy.array: The (words, dimensions) embedding matrix, row i for word ID i.
+    """
+    vocabulary = build_vocabulary(embeddings)
+    if not len(vocabulary):
+        return vocabulary, np.empty((0, 0))
+    matrix = np.stack([embeddings[word] for word in vocabulary.tolist()])
+    return vocabulary, matrix
+
+
+def quantize_vector(vector, scale=127):
+    """
+    Quantizes one embedding vector to integers for integer-scheme (BFV) encryption.
+
+    The vector is normalized to unit length before scaling, so the dot product
+    of two quantized vectors approximates scale**2 times their cosine similarity.
+
+    Args:
+        vector (numpy.array): The embedding vector.
+        scale (int): The largest quantized magnitude. The default of 127 gives int8 values.
+
+    Returns:
+        numpy.array: The quantized vector.
+    """
+    unit_vector = np.asarray(vector, dtype=np.float64) / np.linalg.norm(vector)
+    return np.clip(np.rint(unit_vector * scale), -scale, scale).astype(np.int64)
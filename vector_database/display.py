@@ -5,22 +5,30 @@ import os
 import pickle
 import numpy as np
 
+from vector_database.schemes import vector_from, decrypt_similarity
+from vector_database.vocabulary import vocabulary_fingerprint
+
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 data_dir = 'data'
 
 
-def load_encrypted_results(results_path='data/encrypted_results.bin', context_private_path='data/context_private.bin'):
+def load_encrypted_results(results_path='data/encrypted_results.bin', context_private_path='data/context_private.bin', vocabulary=None):
     """
     Loads the encrypted results from file.
 
     Args:
         results_path (str): Path to the encrypted results file.
         context_private_path (str): Path to the private context file.
+        vocabulary (numpy.array, optional): The vocabulary the result IDs are decoded with.
+            If given, it must match the fingerprint stored with the results.
 
     Returns:
-        dict: Dictionary of words to encrypted cosine similarity values.
+        dict: Dictionary of word IDs to encrypted cosine similarity values.
         ts.Context: The private TenSEAL context.
+
+    Raises:
+        ValueError: If the results were computed against a different vocabulary.
     """
 
     # Set default paths if not provided
@@ -36,34 +44,74 @@ def load_encrypted_results(results_path='data/encrypted_results.bin', context_pr
 
     # Load encrypted results
     with open(results_path, 'rb') as f:
-        encrypted_results_bytes = pickle.load(f)
+        header = pickle.load(f)
+        results = pickle.load(f)
+
+    if vocabulary is not None and header['vocabulary_fingerprint'] is not None:
+        if header['vocabulary_fingerprint'] != vocabulary_fingerprint(vocabulary):
+            raise ValueError(f"Encrypted results in {results_path} do not match the vocabulary.")
 
     # Deserialize encrypted results
     encrypted_results = {}
-    for word, enc_bytes in encrypted_results_bytes.items():
-        encrypted_value = ts.ckks_vector_from(context, enc_bytes)
-        encrypted_results[word] = encrypted_value
+    for word_id, enc_bytes in zip(results['ids'].tolist(), results['encrypted_results']):
+        encrypted_value = vector_from(context, enc_bytes)
+        encrypted_results[word_id] = encrypted_value
 
     return encrypted_results, context
 
 
+def load_encrypted_results_header(results_path='data/encrypted_results.bin'):
+    """
+    Loads only the header of the encrypted results file.
+
+    Args:
+        results_path (str): Path to the encrypted results file.
+
+    Returns:
+        dict: The fingerprints of the vocabulary and of the encrypted store the results were computed against.
+    """
+    with open(results_path, 'rb') as f:
+        return pickle.load(f)
+
+
 def decrypt_results(encrypted_results):
     """
     Decrypts the encrypted results.
 
     Args:
-        encrypted_results (dict): Dictionary of words to encrypted cosine similarity values.
+        encrypted_results (dict): Dictionary of word IDs to encrypted cosine similarity values.
 
     Returns:
-        dict: Dictionary of words to decrypted cosine similarity values.
+        dict: Dictionary of word IDs to decrypted cosine similarity values.
     """
     decrypted_results = {}
-    for word, enc_value in encrypted_results.items():
-        decrypted_value = enc_value.decrypt()[0]
-        decrypted_results[word] = decrypted_value
+    for word_id, enc_value in encrypted_results.items():
+        decrypted_value = decrypt_similarity(enc_value)
+        decrypted_results[word_id] = decrypted_value
     return decrypted_results
 
 
+def top_k(results, k):
+    """
+    Returns the k words with the highest similarity.
+
+    Args:
+        results (dict or numpy.array): Dictionary of words or word IDs to similarity values,
+            or an array of similarity values indexed by word ID.
+        k (int): Number of words to return.
+
+    Returns:
+        list: The top k words or word IDs, highest similarity first.
+    """
+    if isinstance(results, np.ndarray):
+        k = min(k, len(results))
+        if k == 0:
+            return []
+        candidates = np.argpartition(-results, k - 1)[:k]
+        return candidates[np.argsort(-results[candidates], kind='stable')].tolist()
+    return sorted(results, key=results.get, reverse=True)[:k]
+
+
 def compute_plaintext_similarities(embeddings, query_vector):
     """
     Computes the plaintext cosine similarities between the query vector and embeddings.
@@ -85,22 +133,38 @@ def compute_plaintext_similarities(embeddings, query_vector):
     return plaintext_results
 
 
-def display_results(decrypted_results, plaintext_results):
+def compute_plaintext_similarity_array(matrix, query_vector):
+    """
+    Computes the plaintext cosine similarities between the query vector and every row of an embedding matrix at once.
+
+    Args:
+        matrix (numpy.array): The embedding matrix, row i for word ID i.
+        query_vector (numpy.array): The query vector.
+
+    Returns:
+        numpy.array: The plaintext cosine similarity values, indexed by word ID.
+    """
+    return (matrix @ query_vector) / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector))
+
+
+def display_results(decrypted_results, plaintext_results, vocabulary=None):
     """
     Displays the decrypted and plaintext results, along with their differences.
 
     Args:
-        decrypted_results (dict): Dictionary of words to decrypted cosine similarity values.
-        plaintext_results (dict): Dictionary of words to plaintext cosine similarity values.
+        decrypted_results (dict): Dictionary of words or word IDs to decrypted cosine similarity values.
+        plaintext_results (dict or numpy.array): Plaintext cosine similarity values, looked up by the same keys.
+        vocabulary (numpy.array, optional): The vocabulary used to print the words of word IDs.
 
     Returns:
         None
     """
     print("\nResults:")
-    for word in decrypted_results:
-        decrypted_value = decrypted_results[word]
-        plaintext_value = plaintext_results[word]
+    for key in decrypted_results:
+        decrypted_value = decrypted_results[key]
+        plaintext_value = plaintext_results[key]
         difference = abs(decrypted_value - plaintext_value)
+        word = vocabulary[key] if vocabulary is not None else key
         print(f"Word: {word}")
         print(f"  Decrypted Cosine Similarity^2: {decrypted_value}")
         print(f"  Plaintext Cosine Similarity^2: {plaintext_value}")
@@ -1,40 +1,49 @@
 # vector_database/encryption.py
 
 import tenseal as ts
+import hashlib
 import pickle
-import numpy as np
 
 import os
 import sys
 
+from vector_database.data_loader import embeddings_to_matrix
+from vector_database.schemes import SCHEME_CKKS, BFV_PLAIN_MODULUS, new_context, encrypt_embedding, seeded_encryptor
+from vector_database.vocabulary import vocabulary_fingerprint, save_vocabulary
+
 script_dir = os.path.dirname(os.path.abspath(__file__))
 #print(script_dir)
 
-def create_contexts(poly_modulus_degree=32768, coeff_mod_bit_sizes=None, global_scale=2**40, context_dir='data'):
+def create_contexts(poly_modulus_degree=None, coeff_mod_bit_sizes=None, global_scale=2**40, context_dir='data', scheme=SCHEME_CKKS, plain_modulus=BFV_PLAIN_MODULUS, symmetric=False):
     """
     Creates TenSEAL contexts with and without private keys and saves them to files.
 
+    With symmetric, the private context encrypts with the secret key, for
+    owner-side ingestion. It has no public key, so the context saved for the
+    compute server holds only the relinearization and Galois keys: enough to
+    evaluate, but it cannot encrypt or decrypt.
+
     Args:
-        poly_modulus_degree (int): The degree of the polynomial modulus.
+        poly_modulus_degree (int, optional): The degree of the polynomial modulus. Defaults to 32768 for CKKS and 8192 for BFV.
         coeff_mod_bit_sizes (list): List of coefficient modulus sizes.
-        global_scale (float): The global scale parameter.
+        global_scale (float): The global scale parameter (CKKS only).
         context_dir (str): Directory to save the contexts.
+        scheme (str): The encryption scheme, either 'ckks' or 'bfv'.
+        plain_modulus (int): The plaintext modulus (BFV only).
+        symmetric (bool): Create a symmetric context for owner-side encryption with the secret key.
 
     Returns:
         None
     """
-    if coeff_mod_bit_sizes is None:
-        coeff_mod_bit_sizes = [60] + [40] * 4 + [60]
-
     # Create context with secret key
-    context = ts.context(
-        ts.SCHEME_TYPE.CKKS,
+    context = new_context(
+        scheme,
         poly_modulus_degree=poly_modulus_degree,
         coeff_mod_bit_sizes=coeff_mod_bit_sizes,
+        global_scale=global_scale,
+        plain_modulus=plain_modulus,
+        symmetric=symmetric,
     )
-    context.global_scale = global_scale
-    context.generate_galois_keys()
-    context.generate_relin_keys()
     
     
     # If context_dir is not an absolute path, make it relative to script_dir
@@ -54,11 +63,17 @@ def create_contexts(poly_modulus_degree=32768, coeff_mod_bit_sizes=None, global_
     with open(context_private_path, 'wb') as f:
         f.write(context_private)
 
-    # Remove secret key
-    context.make_context_public()
+    if symmetric:
+        # Symmetric contexts cannot be made public, so serialize the evaluation keys only
+        context_public = context.serialize(
+            save_public_key=False, save_secret_key=False, save_galois_keys=True, save_relin_keys=True
+        )
+    else:
+        # Remove secret key
+        context.make_context_public()
 
-    # Serialize context without secret key
-    context_public = context.serialize()
+        # Serialize context without secret key
+        context_public = context.serialize()
 
     # Save context without secret key
     context_public_path = os.path.join(context_dir, 'context_public.bin')
@@ -68,61 +83,125 @@ def create_contexts(poly_modulus_degree=32768, coeff_mod_bit_sizes=None, global_
     print(f"Contexts saved to {context_dir}")
 
 
-def encrypt_embeddings(embeddings, context_public_path='data/context_public.bin', encrypted_data_path='data/encrypted_vectors.bin'):
+def encrypt_embeddings(embeddings, context_public_path='data/context_public.bin', encrypted_data_path='data/encrypted_vectors.bin', unit_norm=False, vocabulary_path='data/vocabulary.txt', context_private_path=None):
     """
     Encrypts embeddings and their inverse norms using the public context and saves them to a file.
 
+    Under a BFV context the embeddings are quantized to unit-length integer
+    vectors instead, and no inverse norms are stored.
+
     Args:
         embeddings (dict): Dictionary of word embeddings.
         context_public_path (str): Path to the public context file.
         encrypted_data_path (str): Path to save the encrypted embeddings.
+        unit_norm (bool): Encrypt unit-length vectors without inverse norms, so they are scored by dot product alone.
+        vocabulary_path (str, optional): Path to save the vocabulary index. Not saved if None.
+        context_private_path (str, optional): Path to the private context file. If given, the data owner
+            encrypts with it instead of the public context, which a symmetric context requires, and
+            the ciphertexts are saved seeded.
 
     Returns:
-        None
+        numpy.array: The vocabulary, whose positions are the IDs used in the encrypted store.
     """
-    # Load public context
-    
-    if not os.path.isabs(context_public_path):
-        context_public_path = os.path.join(script_dir, '..', context_public_path)
-        
-    if not os.path.isabs(encrypted_data_path):
-        encrypted_data_path = os.path.join(script_dir, '..', encrypted_data_path)
-    
-    print(context_public_path)
-    with open(context_public_path, 'rb') as f:
-        context = ts.context_from(f.read())
+    vocabulary, matrix = embeddings_to_matrix(embeddings)
+    encrypt_embedding_matrix(
+        vocabulary,
+        matrix,
+        context_public_path=context_public_path,
+        encrypted_data_path=encrypted_data_path,
+        unit_norm=unit_norm,
+        vocabulary_path=vocabulary_path,
+        context_private_path=context_private_path,
+    )
+    return vocabulary
 
-    # Prepare data for encryption
-    encrypted_embeddings = {}
 
-    for word, vector in embeddings.items():
-        # Compute the inverse norm
-        norm = np.linalg.norm(vector)
-        inv_norm = 1.0 / norm
+def encrypt_embedding_matrix(vocabulary, matrix, context_public_path='data/context_public.bin', encrypted_data_path='data/encrypted_vectors.bin', unit_norm=False, vocabulary_path='data/vocabulary.txt', context_private_path=None):
+    """
+    Encrypts an embedding matrix and its inverse norms using the public context and saves them to a file.
+
+    The store addresses words by integer ID only. It is a small header pickle
+    (the vocabulary fingerprint, a fingerprint of the ciphertexts, the number
+    of words and whether the ciphertexts are seeded), then an index pickle
+    holding the offset of each word's record and the length of its vector,
+    then the records in ID order: the serialized vector followed by the
+    serialized inverse norm, if any. The index lets a reader seek to the words
+    it needs without reading the rest. The words themselves are saved once, to
+    the vocabulary file. Encryption is randomized, so re-encrypting the store
+    always changes its fingerprint, which serves as the store's version.
+
+    When the data owner encrypts with the secret key, the ciphertexts are
+    saved seeded (see seeded_encryptor), which halves the store. They are
+    expanded as they are deserialized, on the compute server.
+
+    Args:
+        vocabulary (numpy.array): The sorted array of words.
+        matrix (numpy.array): The embedding matrix, row i for word ID i.
+        context_public_path (str): Path to the public context file.
+        encrypted_data_path (str): Path to save the encrypted embeddings.
+        unit_norm (bool): Encrypt unit-length vectors without inverse norms, so they are scored by dot product alone.
+        vocabulary_path (str, optional): Path to save the vocabulary index. Not saved if None.
+        context_private_path (str, optional): Path to the private context file. If given, the data owner
+            encrypts with it instead of the public context, which a symmetric context requires, and
+            the ciphertexts are saved seeded.
 
-        # Encrypt vector
-        encrypted_vector = ts.ckks_vector(context, vector)
-        # Encrypt inverse norm
-        encrypted_inv_norm = ts.ckks_vector(context, [inv_norm])
+    Returns:
+        None
+    """
+    if not os.path.isabs(encrypted_data_path):
+        encrypted_data_path = os.path.join(script_dir, '..', encrypted_data_path)
 
-        # Serialize encrypted vector and inverse norm
-        encrypted_vector_bytes = encrypted_vector.serialize()
-        encrypted_inv_norm_bytes = encrypted_inv_norm.serialize()
+    if vocabulary_path is not None and not os.path.isabs(vocabulary_path):
+        vocabulary_path = os.path.join(script_dir, '..', vocabulary_path)
 
-        # Store in dictionary
-        encrypted_embeddings[word] = {
-            'encrypted_vector': encrypted_vector_bytes,
-            'encrypted_inv_norm': encrypted_inv_norm_bytes
-        }
+    context = _load_encryption_context(context_public_path, context_private_path)
+    seeded = context_private_path is not None
+    encrypt = _embedding_encryptor(context, seeded)
 
-    # Save encrypted embeddings to file
+    # Prepare data for encryption
+    encrypted_vectors = []
+    encrypted_inv_norms = []
+    store_digest = hashlib.sha256()
+
+    for vector in matrix:
+        # Encrypt and serialize vector and inverse norm for the context's scheme
+        encrypted_vector, encrypted_inv_norm = encrypt(vector, unit_norm=unit_norm)
+        encrypted_vectors.append(encrypted_vector)
+        encrypted_inv_norms.append(encrypted_inv_norm)
+        store_digest.update(encrypted_vectors[-1])
+        if encrypted_inv_norms[-1] is not None:
+            store_digest.update(encrypted_inv_norms[-1])
+
+    # Offsets of the records relative to the end of the index, one past the last record included
+    offsets = [0]
+    for encrypted_vector, encrypted_inv_norm in zip(encrypted_vectors, encrypted_inv_norms):
+        offsets.append(offsets[-1] + len(encrypted_vector) + (len(encrypted_inv_norm) if encrypted_inv_norm is not None else 0))
+
+    # Save encrypted embeddings to file, header first so it can be read on its own
     with open(encrypted_data_path, 'wb') as f:
-        pickle.dump(encrypted_embeddings, f)
+        pickle.dump({
+            'vocabulary_fingerprint': vocabulary_fingerprint(vocabulary),
+            'store_fingerprint': store_digest.hexdigest()[:16],
+            'size': len(encrypted_vectors),
+            'seeded': seeded,
+            'indexed': True
+        }, f)
+        pickle.dump({
+            'offsets': offsets,
+            'vector_lengths': [len(encrypted_vector) for encrypted_vector in encrypted_vectors]
+        }, f)
+        for encrypted_vector, encrypted_inv_norm in zip(encrypted_vectors, encrypted_inv_norms):
+            f.write(encrypted_vector)
+            if encrypted_inv_norm is not None:
+                f.write(encrypted_inv_norm)
 
     print(f"Encrypted embeddings and inverse norms saved to {encrypted_data_path}")
 
+    if vocabulary_path is not None:
+        save_vocabulary(vocabulary, vocabulary_path)
+
 
-def encrypt_query(query_word, embeddings, context_public_path='data/context_public.bin', encrypted_query_path='data/encrypted_query.bin'):
+def encrypt_query(query_word, embeddings, context_public_path='data/context_public.bin', encrypted_query_path='data/encrypted_query.bin', unit_norm=False, context_private_path=None):
     """
     Encrypts the query vector and its inverse norm corresponding to the query word using the public context and saves it to a file.
 
@@ -131,13 +210,15 @@ def encrypt_query(query_word, embeddings, context_public_path='data/context_publ
         embeddings (dict): Dictionary of word embeddings.
         context_public_path (str): Path to the public context file.
         encrypted_query_path (str): Path to save the encrypted query.
+        unit_norm (bool): Encrypt the unit-length query vector without its inverse norm.
+        context_private_path (str, optional): Path to the private context file. If given, the query
+            is encrypted with it instead of the public context, which a symmetric context requires,
+            and saved seeded.
 
     Returns:
         None
     """
     
-    if not os.path.isabs(context_public_path):
-        context_public_path = os.path.join(script_dir, '..', context_public_path)
     if not os.path.isabs(encrypted_query_path):
         encrypted_query_path = os.path.join(script_dir, '..', encrypted_query_path)
     
@@ -145,26 +226,16 @@ def encrypt_query(query_word, embeddings, context_public_path='data/context_publ
     encrypted_query_dir = os.path.dirname(encrypted_query_path)
     os.makedirs(encrypted_query_dir, exist_ok=True)
     
-    # Load public context
-    with open(context_public_path, 'rb') as f:
-        context = ts.context_from(f.read())
+    context = _load_encryption_context(context_public_path, context_private_path)
 
     if query_word not in embeddings:
         raise ValueError(f"Query word '{query_word}' not found in embeddings.")
 
     vector = embeddings[query_word]
-    # Compute the inverse norm
-    norm = np.linalg.norm(vector)
-    inv_norm = 1.0 / norm
 
-    # Encrypt query vector
-    encrypted_query = ts.ckks_vector(context, vector)
-    # Encrypt inverse norm
-    encrypted_inv_norm = ts.ckks_vector(context, [inv_norm])
-
-    # Serialize encrypted query vector and inverse norm
-    encrypted_query_bytes = encrypted_query.serialize()
-    encrypted_inv_norm_bytes = encrypted_inv_norm.serialize()
+    # Encrypt and serialize query vector and inverse norm for the context's scheme
+    encrypt = _embedding_encryptor(context, seeded=context_private_path is not None)
+    encrypted_query_bytes, encrypted_inv_norm_bytes = encrypt(vector, unit_norm=unit_norm)
 
     # Save encrypted query vector and inverse norm to file
     with open(encrypted_query_path, 'wb') as f:
@@ -174,3 +245,29 @@ def encrypt_query(query_word, embeddings, context_public_path='data/context_publ
         }, f)
 
     print(f"Encrypted query vector and inverse norm saved to {encrypted_query_path}")
+
+
+def _load_encryption_context(context_public_path, context_private_path=None):
+    """
+    Loads the context to encrypt with: the private context if given, otherwise the public one.
+    """
+    context_path = context_private_path if context_private_path is not None else context_public_path
+    if not os.path.isabs(context_path):
+        context_path = os.path.join(script_dir, '..', context_path)
+
+    with open(context_path, 'rb') as f:
+        return ts.context_from(f.read())
+
+
+def _embedding_encryptor(context, seeded):
+    """
+    Returns a function that encrypts and serializes one embedding and its inverse norm, seeded if requested.
+    """
+    if seeded:
+        return seeded_encryptor(context)
+
+    def encrypt(vector, unit_norm=False):
+        encrypted_vector, encrypted_inv_norm = encrypt_embedding(context, vector, unit_norm=unit_norm)
+        return encrypted_vector.serialize(), encrypted_inv_norm.serialize() if encrypted_inv_norm is not None else None
+
+    return encrypt
@@ -0,0 +1,240 @@
+# vector_database/registry.py
+
+import tenseal as ts
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from vector_database.computation import (
+    load_encrypted_store_header,
+    load_encrypted_embeddings_bytes,
+    deserialize_encrypted_embeddings,
+    deserialize_encrypted_query,
+    compute_encrypted_cosine_similarities,
+    SCHEDULE_AUTO,
+)
+
+
+# Memory budget for the contexts and stores held at once. The default
+# 32768-degree public context alone is about 400 MB serialized.
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def key_fingerprint(context_public_path):
+    """
+    Computes a short fingerprint of the keys in a public context file.
+
+    The public context holds the public, relinearization and Galois keys, all
+    derived from one secret key, so the fingerprint identifies a tenant's key.
+
+    Args:
+        context_public_path (str): Path to the public context file.
+
+    Returns:
+        str: The hexadecimal fingerprint.
+    """
+    digest = hashlib.sha256()
+    with open(context_public_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class ContextRegistry:
+    """
+    Holds the public contexts and encrypted stores of many tenants on the compute server.
+
+    Tenants are registered by path and keyed by the fingerprint of their public
+    context. A tenant's context and deserialized store are loaded together on
+    first use and kept in least-recently-used order. Before a tenant is
+    loaded, the least recently used tenants are evicted until it fits within
+    max_bytes, and are reloaded from disk on their next use. Sizes are
+    estimated from the serialized files, which track the deserialized size
+    closely, except that a seeded store expands to about twice its file size
+    and is counted twice.
+
+    The registry is thread-safe. Loading runs outside the registry lock, so
+    requests for resident tenants are not held up by another tenant's load,
+    and concurrent requests for the same tenant wait for a single load.
+
+    Args:
+        max_bytes (int): Memory budget for the resident contexts and stores.
+            A tenant larger than the budget is still loaded, on its own.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._paths = {}
+        self._resident = OrderedDict()
+        self._loading_locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, context_public_path, encrypted_data_path):
+        """
+        Registers a tenant's public context and encrypted store without loading them.
+
+        Registering the same key again points it at the new files and drops
+        the copy held in memory.
+
+        Args:
+            context_public_path (str): Path to the tenant's public context file.
+            encrypted_data_path (str): Path to the tenant's encrypted embeddings file.
+
+        Returns:
+            str: The key fingerprint the tenant is registered under.
+        """
+        fingerprint = key_fingerprint(context_public_path)
+        with self._lock:
+            self._paths[fingerprint] = (context_public_path, encrypted_data_path)
+            self._resident.pop(fingerprint, None)
+        return fingerprint
+
+    def unregister(self, fingerprint):
+        """
+        Removes a tenant and drops its context and store from memory.
+
+        Args:
+            fingerprint (str): The tenant's key fingerprint.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._paths.pop(fingerprint, None)
+            self._resident.pop(fingerprint, None)
+            self._loading_locks.pop(fingerprint, None)
+
+    def get(self, fingerprint):
+        """
+        Returns a tenant's public context and deserialized store, loading them if they are not resident.
+
+        Args:
+            fingerprint (str): The tenant's key fingerprint.
+
+        Returns:
+            ts.Context: The tenant's public TenSEAL context.
+            dict: A dictionary mapping word IDs to encrypted vectors and inverse norms.
+
+        Raises:
+            KeyError: If no tenant is registered under the fingerprint.
+        """
+        with self._lock:
+            entry = self._lookup(fingerprint)
+            if entry is not None:
+                return entry['context'], entry['encrypted_embeddings']
+            loading_lock = self._loading_locks.setdefault(fingerprint, threading.Lock())
+
+        with loading_lock:
+            with self._lock:
+                # Another request may have loaded the tenant while this one waited
+                entry = self._lookup(fingerprint)
+                if entry is not None:
+                    return entry['context'], entry['encrypted_embeddings']
+                self.misses += 1
+                paths = self._paths[fingerprint]
+                self._evict(self.max_bytes - self._size(*paths))
+
+            entry = self._load(*paths)
+
+            with self._lock:
+                # Other tenants may have been loaded meanwhile, and this one re-registered or removed
+                if self._paths.get(fingerprint) == paths:
+                    self._evict(self.max_bytes - entry['size'])
+                    self._resident[fingerprint] = entry
+
+        return entry['context'], entry['encrypted_embeddings']
+
+    def query(self, fingerprint, encrypted_query_path, schedule=SCHEDULE_AUTO):
+        """
+        Computes the encrypted cosine similarities of a tenant's store against an encrypted query.
+
+        Safe to call from several threads, including queries on the same tenant.
+
+        Args:
+            fingerprint (str): The tenant's key fingerprint.
+            encrypted_query_path (str): Path to the encrypted query file, encrypted under the tenant's key.
+            schedule (str): Kernel mode passed to compute_encrypted_cosine_similarities.
+
+        Returns:
+            dict: Dictionary of word IDs to encrypted cosine similarity values.
+        """
+        context, encrypted_embeddings = self.get(fingerprint)
+
+        with open(encrypted_query_path, 'rb') as f:
+            encrypted_query_data = pickle.load(f)
+        encrypted_query_vector, encrypted_query_inv_norm = deserialize_encrypted_query(encrypted_query_data, context)
+
+        return compute_encrypted_cosine_similarities(
+            encrypted_query_vector, encrypted_query_inv_norm, encrypted_embeddings, schedule=schedule
+        )
+
+    def stats(self):
+        """
+        Reports the cache counters and the resident size.
+
+        Returns:
+            dict: Hits, misses, evictions, registered and resident tenants, and resident bytes.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'registered': len(self._paths),
+                'resident': len(self._resident),
+                'resident_bytes': self._resident_bytes(),
+            }
+
+    def _lookup(self, fingerprint):
+        """
+        Returns a resident tenant's entry and counts a hit, or None if it is not resident. Call with the lock held.
+        """
+        if fingerprint not in self._paths:
+            raise KeyError(f"No tenant registered under key fingerprint '{fingerprint}'.")
+
+        entry = self._resident.get(fingerprint)
+        if entry is not None:
+            self.hits += 1
+            self._resident.move_to_end(fingerprint)
+        return entry
+
+    def _load(self, context_public_path, encrypted_data_path):
+        """
+        Loads and deserializes a tenant's public context and encrypted store.
+        """
+        with open(context_public_path, 'rb') as f:
+            context = ts.context_from(f.read())
+        encrypted_embeddings = deserialize_encrypted_embeddings(
+            load_encrypted_embeddings_bytes(encrypted_data_path), context
+        )
+        return {
+            'context': context,
+            'encrypted_embeddings': encrypted_embeddings,
+            'size': self._size(context_public_path, encrypted_data_path),
+        }
+
+    def _size(self, context_public_path, encrypted_data_path):
+        """
+        Estimates the deserialized size of a tenant from its files.
+        """
+        store_size = os.path.getsize(encrypted_data_path)
+        # Seeded ciphertexts store one of their two polynomials as a seed and are expanded on load
+        if load_encrypted_store_header(encrypted_data_path)['seeded']:
+            store_size *= 2
+        return os.path.getsize(context_public_path) + store_size
+
+    def _resident_bytes(self):
+        return sum(entry['size'] for entry in self._resident.values())
+
+    def _evict(self, budget):
+        """
+        Evicts least recently used tenants until the resident size fits the budget. Call with the lock held.
+        """
+        while self._resident and self._resident_bytes() > budget:
+            self._resident.popitem(last=False)
+            self.evictions += 1
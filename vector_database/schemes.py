@@ -0,0 +1,340 @@
+# vector_database/schemes.py
+
+import tenseal as ts
+import tenseal.sealapi as sealapi
+import numpy as np
+import os
+import struct
+import tempfile
+
+from vector_database.data_loader import quantize_vector
+
+
+SCHEME_CKKS = 'ckks'
+SCHEME_BFV = 'bfv'
+
+# Default polynomial modulus degree per scheme. BFV only needs depth one for
+# the quantized dot product, so it fits in a much smaller ring.
+DEFAULT_POLY_MODULUS_DEGREE = {
+    SCHEME_CKKS: 32768,
+    SCHEME_BFV: 8192,
+}
+
+# Batching-friendly prime, comfortably above the largest quantized dot product
+BFV_PLAIN_MODULUS = 1032193
+
+# Quantized magnitude of unit-length embeddings under BFV (int8 range)
+QUANTIZATION_SCALE = 127
+
+_SCHEME_TYPES = {
+    SCHEME_CKKS: ts.SCHEME_TYPE.CKKS,
+    SCHEME_BFV: ts.SCHEME_TYPE.BFV,
+}
+
+_VECTOR_FROM = {
+    SCHEME_CKKS: ts.ckks_vector_from,
+    SCHEME_BFV: ts.bfv_vector_from,
+}
+
+
+def new_context(scheme=SCHEME_CKKS, poly_modulus_degree=None, coeff_mod_bit_sizes=None, global_scale=2**40, plain_modulus=BFV_PLAIN_MODULUS, symmetric=False):
+    """
+    Creates a private TenSEAL context for the given scheme, with Galois and relinearization keys.
+
+    Args:
+        scheme (str): Either 'ckks' or 'bfv'.
+        poly_modulus_degree (int, optional): The degree of the polynomial modulus. Uses the scheme default if None.
+        coeff_mod_bit_sizes (list, optional): List of coefficient modulus sizes. Uses the scheme default if None.
+        global_scale (float): The global scale parameter (CKKS only).
+        plain_modulus (int): The plaintext modulus (BFV only).
+        symmetric (bool): Encrypt with the secret key instead of a public key. The context then has no public key.
+
+    Returns:
+        ts.Context: The private TenSEAL context.
+    """
+    if scheme not in _SCHEME_TYPES:
+        raise ValueError(f"Unknown scheme '{scheme}'. Use one of {sorted(_SCHEME_TYPES)}.")
+
+    if poly_modulus_degree is None:
+        poly_modulus_degree = DEFAULT_POLY_MODULUS_DEGREE[scheme]
+
+    encryption_type = ts.ENCRYPTION_TYPE.SYMMETRIC if symmetric else ts.ENCRYPTION_TYPE.ASYMMETRIC
+
+    if scheme == SCHEME_CKKS:
+        if coeff_mod_bit_sizes is None:
+            coeff_mod_bit_sizes = [60] + [40] * 4 + [60]
+        context = ts.context(
+            ts.SCHEME_TYPE.CKKS,
+            poly_modulus_degree=poly_modulus_degree,
+            coeff_mod_bit_sizes=coeff_mod_bit_sizes,
+            encryption_type=encryption_type,
+        )
+        context.global_scale = global_scale
+    else:
+        # An empty list lets SEAL pick its default coefficient modulus
+        context = ts.context(
+            ts.SCHEME_TYPE.BFV,
+            poly_modulus_degree=poly_modulus_degree,
+            plain_modulus=plain_modulus,
+            coeff_mod_bit_sizes=coeff_mod_bit_sizes or [],
+            encryption_type=encryption_type,
+        )
+
+    context.generate_galois_keys()
+    context.generate_relin_keys()
+
+    return context
+
+
+def context_scheme(context):
+    """
+    Returns the scheme a TenSEAL context was created for.
+
+    Args:
+        context (ts.Context): The TenSEAL context.
+
+    Returns:
+        str: Either 'ckks' or 'bfv'.
+    """
+    scheme_type = context.data.seal_context().first_context_data().parms().scheme()
+    if scheme_type == ts.SCHEME_TYPE.BFV.value:
+        return SCHEME_BFV
+    return SCHEME_CKKS
+
+
+def encrypt_embedding(context, vector, unit_norm=False):
+    """
+    Encrypts one embedding for the scheme of the context.
+
+    Under CKKS the raw vector and its inverse norm are encrypted. Under BFV the
+    vector is quantized to unit length first, so no inverse norm is needed.
+
+    Args:
+        context (ts.Context): The TenSEAL context.
+        vector (numpy.array): The embedding vector.
+        unit_norm (bool): Under CKKS, encrypt the vector normalized to unit length
+            instead of storing its inverse norm. This saves two multiplications per score.
+
+    Returns:
+        tuple: The encrypted vector and encrypted inverse norm (None under BFV or with unit_norm).
+    """
+    encrypt = ts.bfv_vector if context_scheme(context) == SCHEME_BFV else ts.ckks_vector
+    values, inv_norm_values = _embedding_values(context, vector, unit_norm)
+    if inv_norm_values is None:
+        return encrypt(context, values), None
+    return encrypt(context, values), encrypt(context, inv_norm_values)
+
+
+def seeded_encryptor(context):
+    """
+    Creates an owner-side encryptor that serializes embeddings as seeded ciphertexts.
+
+    The second half of a ciphertext encrypted with the secret key is uniformly
+    random, so SEAL can save the seed it was generated from instead, which
+    halves the serialized size. Loading the ciphertext regenerates it, so
+    vector_from expands seeded vectors like any other. TenSEAL always
+    serializes expanded ciphertexts, so this encrypts through the SEAL API and
+    wraps each seeded ciphertext in TenSEAL's vector format.
+
+    Args:
+        context (ts.Context): A private TenSEAL context, with the secret key.
+
+    Returns:
+        function: Takes a vector and unit_norm like encrypt_embedding, and returns the serialized
+            encrypted vector and encrypted inverse norm (None under BFV or with unit_norm).
+    """
+    seal_context = context.data.seal_context()
+
+    # TenSEAL's secret key is a separate binding, so it is copied over through a file
+    secret_key = sealapi.SecretKey()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        secret_key_path = os.path.join(tmp_dir, 'secret_key.bin')
+        context.data.secret_key().save(secret_key_path)
+        secret_key.load(seal_context, secret_key_path)
+    encryptor = sealapi.Encryptor(seal_context, secret_key)
+
+    if context_scheme(context) == SCHEME_BFV:
+        encoder = sealapi.BatchEncoder(seal_context)
+        scale = None
+    else:
+        encoder = sealapi.CKKSEncoder(seal_context)
+        scale = context.global_scale
+
+    def encrypt(values):
+        if len(values) > encoder.slot_count():
+            raise ValueError(f"Cannot encrypt {len(values)} values in {encoder.slot_count()} slots.")
+
+        # TenSEAL replicates a vector across all slots, which its sum() relies on
+        replicated_values = np.resize(values, encoder.slot_count()).tolist()
+        plaintext = sealapi.Plaintext()
+        if scale is None:
+            encoder.encode(replicated_values, plaintext)
+        else:
+            encoder.encode(replicated_values, scale, plaintext)
+
+        ciphertext = ciphertext_to_bytes(encryptor.encrypt_symmetric(plaintext))
+        return vector_to_bytes([ciphertext], [len(values)], scale=scale)
+
+    def encrypt_seeded(vector, unit_norm=False):
+        values, inv_norm_values = _embedding_values(context, vector, unit_norm)
+        if inv_norm_values is None:
+            return encrypt(values), None
+        return encrypt(values), encrypt(inv_norm_values)
+
+    return encrypt_seeded
+
+
+def _embedding_values(context, vector, unit_norm):
+    """
+    Returns the values to encrypt for an embedding and its inverse norm (None under BFV or with unit_norm).
+    """
+    if context_scheme(context) == SCHEME_BFV:
+        return quantize_vector(vector, scale=QUANTIZATION_SCALE).tolist(), None
+
+    inv_norm = 1.0 / np.linalg.norm(vector)
+    if unit_norm:
+        return (np.asarray(vector) * inv_norm).tolist(), None
+    return np.asarray(vector).tolist(), [inv_norm]
+
+
+def vector_from(context, data):
+    """
+    Deserializes an encrypted vector for the scheme of the context.
+
+    Args:
+        context (ts.Context): The TenSEAL context.
+        data (bytes): The serialized encrypted vector, or None.
+
+    Returns:
+        CKKSVector or BFVVector: The encrypted vector, or None if data is None.
+    """
+    if data is None:
+        return None
+    return _VECTOR_FROM[context_scheme(context)](context, data)
+
+
+def ciphertext_to_bytes(ciphertext):
+    """
+    Serializes a SEAL ciphertext, as TenSEAL stores it inside an encrypted vector.
+
+    The SEAL API only saves ciphertexts to files, so this goes through a temporary file.
+
+    Args:
+        ciphertext (sealapi.Ciphertext or sealapi.SerializableCiphertext): The ciphertext.
+
+    Returns:
+        bytes: The serialized ciphertext.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'ciphertext.bin')
+        ciphertext.save(path)
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+def vector_to_bytes(ciphertexts, sizes, scale=None):
+    """
+    Serializes SEAL ciphertexts as a TenSEAL encrypted vector.
+
+    TenSEAL has no constructor taking ciphertexts, so this encodes the
+    CKKSVectorProto or BFVVectorProto message that TenSEAL itself serializes
+    vectors to. The result loads with vector_from.
+
+    Args:
+        ciphertexts (list): The serialized ciphertexts, one per chunk of the vector.
+        sizes (list): The number of encrypted values in each chunk.
+        scale (float, optional): The scale of the ciphertexts (CKKS only).
+
+    Returns:
+        bytes: The serialized encrypted vector.
+    """
+    # Field 1: packed uint32 sizes; field 2: bytes per ciphertext; field 3: double scale
+    packed_sizes = b''.join(_varint(size) for size in sizes)
+    data = b'\x0a' + _varint(len(packed_sizes)) + packed_sizes
+    for ciphertext in ciphertexts:
+        data += b'\x12' + _varint(len(ciphertext)) + ciphertext
+    if scale is not None:
+        data += b'\x19' + struct.pack('<d', scale)
+    return data
+
+
+def vector_from_bytes(data):
+    """
+    Parses a serialized TenSEAL encrypted vector into its SEAL ciphertexts.
+
+    The inverse of vector_to_bytes, for rebuilding a vector with different
+    sizes without decrypting it.
+
+    Args:
+        data (bytes): The serialized encrypted vector.
+
+    Returns:
+        list: The serialized ciphertexts, one per chunk of the vector.
+        list: The number of encrypted values in each chunk.
+        float: The scale of the ciphertexts, or None if the vector has none.
+    """
+    ciphertexts, sizes, scale = [], [], None
+    position = 0
+    while position < len(data):
+        tag, position = _read_varint(data, position)
+        field, wire_type = tag >> 3, tag & 0x7
+        if wire_type == 2:
+            length, position = _read_varint(data, position)
+            value = data[position:position + length]
+            position += length
+            if field == 1:
+                offset = 0
+                while offset < len(value):
+                    size, offset = _read_varint(value, offset)
+                    sizes.append(size)
+            elif field == 2:
+                ciphertexts.append(value)
+        elif wire_type == 1:
+            if field == 3:
+                scale = struct.unpack('<d', data[position:position + 8])[0]
+            position += 8
+        else:
+            raise ValueError(f"Unexpected wire type {wire_type} in a serialized encrypted vector.")
+    return ciphertexts, sizes, scale
+
+
+def _varint(value):
+    """
+    Encodes a non-negative integer as a protocol buffer varint.
+    """
+    encoded = bytearray()
+    while value > 0x7f:
+        encoded.append((value & 0x7f) | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def _read_varint(data, position):
+    """
+    Decodes a protocol buffer varint, returning it and the position after it.
+    """
+    value, shift = 0, 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, position
+
+
+def decrypt_similarity(encrypted_value):
+    """
+    Decrypts an encrypted similarity and decodes it back to a cosine similarity.
+
+    Args:
+        encrypted_value (CKKSVector or BFVVector): The encrypted similarity.
+
+    Returns:
+        float: The decrypted cosine similarity.
+    """
+    value = encrypted_value.decrypt()[0]
+    if isinstance(encrypted_value, ts.BFVVector):
+        return value / QUANTIZATION_SCALE ** 2
+    return value
@@ -0,0 +1,378 @@
+# vector_database/sharding.py
+
+import tenseal as ts
+import hashlib
+import multiprocessing
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client, Listener
+
+from vector_database.computation import (
+    compute_encrypted_cosine_similarities,
+    deserialize_encrypted_embeddings,
+    deserialize_encrypted_query,
+    iter_encrypted_embeddings_bytes,
+    save_encrypted_results_bytes,
+    serialize_encrypted_embeddings,
+)
+
+
+def worker_id(address):
+    """
+    Returns the stable identifier of a worker used for shard assignment.
+
+    Args:
+        address (tuple): The (host, port) address of the worker.
+
+    Returns:
+        str: The worker identifier.
+    """
+    host, port = address
+    return f"{host}:{port}"
+
+
+def shard_owner(word_id, worker_addresses):
+    """
+    Picks the worker owning a word using rendezvous (highest random weight) hashing.
+
+    Adding a worker only moves the words that the new worker wins, so a
+    rebalance transfers roughly 1/N of the store instead of reshuffling it.
+
+    Args:
+        word_id (int): The ID of the word to place.
+        worker_addresses (list): List of (host, port) worker addresses.
+
+    Returns:
+        tuple: The address of the owning worker.
+    """
+    def weight(address):
+        key = f"{worker_id(address)}\0{word_id}".encode('utf-8')
+        return hashlib.blake2b(key, digest_size=8).digest()
+
+    return max(worker_addresses, key=weight)
+
+
+def assign_shards(ids, worker_addresses):
+    """
+    Assigns each word to the worker owning it.
+
+    Args:
+        ids (iterable): The IDs of the words to assign.
+        worker_addresses (list): List of (host, port) worker addresses.
+
+    Returns:
+        dict: A dictionary mapping each worker address to its list of word IDs.
+    """
+    shards = {tuple(address): [] for address in worker_addresses}
+    for word_id in ids:
+        shards[tuple(shard_owner(word_id, worker_addresses))].append(word_id)
+    return shards
+
+
+def run_worker(address=('localhost', 0), authkey=None, ready=None):
+    """
+    Serves one shard of the encrypted store until a shutdown request arrives.
+
+    The worker holds the public context and its shard of deserialized
+    encrypted embeddings in memory, and answers requests sent by the
+    coordinator functions in this module.
+
+    Args:
+        address (tuple): The (host, port) address to listen on. Port 0 picks a free port.
+        authkey (bytes): Key used to authenticate the coordinator. Defaults to the process authkey.
+        ready (Connection, optional): Pipe end on which the bound address is reported once listening.
+
+    Returns:
+        None
+    """
+    if authkey is None:
+        authkey = multiprocessing.current_process().authkey
+
+    context = None
+    encrypted_embeddings = {}
+
+    with Listener(address, authkey=authkey) as listener:
+        if ready is not None:
+            ready.send(listener.address)
+            ready.close()
+
+        while True:
+            try:
+                conn = listener.accept()
+            except (multiprocessing.AuthenticationError, EOFError, ConnectionError):
+                # A client that failed or dropped the handshake
+                continue
+
+            with conn:
+                op = None
+                try:
+                    op, payload = conn.recv()
+
+                    if op == 'shutdown':
+                        response = None
+                    elif op == 'load_context':
+                        context = ts.context_from(payload)
+                        encrypted_embeddings = {}
+                        response = None
+                    elif context is None:
+                        raise RuntimeError("Worker has no context loaded.")
+                    elif op == 'put':
+                        encrypted_embeddings.update(deserialize_encrypted_embeddings(payload, context))
+                        response = len(encrypted_embeddings)
+                    elif op == 'ids':
+                        response = list(encrypted_embeddings)
+                    elif op == 'get':
+                        selected = {word_id: encrypted_embeddings[word_id] for word_id in payload if word_id in encrypted_embeddings}
+                        response = serialize_encrypted_embeddings(selected)
+                    elif op == 'drop':
+                        for word_id in payload:
+                            encrypted_embeddings.pop(word_id, None)
+                        response = len(encrypted_embeddings)
+                    elif op == 'query':
+                        encrypted_query_vector, encrypted_query_inv_norm = deserialize_encrypted_query(payload, context)
+                        encrypted_results = compute_encrypted_cosine_similarities(
+                            encrypted_query_vector, encrypted_query_inv_norm, encrypted_embeddings
+                        )
+                        response = {word_id: enc_value.serialize() for word_id, enc_value in encrypted_results.items()}
+                    else:
+                        raise ValueError(f"Unknown worker operation '{op}'.")
+                    reply = ('ok', response)
+                except (EOFError, OSError):
+                    # The coordinator disconnected mid-request, so there is no one to reply to
+                    continue
+                except Exception as e:
+                    reply = ('error', f"{type(e).__name__}: {e}")
+                finally:
+                    # Do not keep the request (possibly a whole serialized context) alive until the next one
+                    payload = response = None
+
+                try:
+                    conn.send(reply)
+                except OSError:
+                    pass
+
+                if op == 'shutdown':
+                    return
+
+
+def _request(address, op, payload=None, authkey=None):
+    """
+    Sends one request to a worker and returns its response.
+
+    Raises:
+        RuntimeError: If the worker reports an error.
+    """
+    if authkey is None:
+        authkey = multiprocessing.current_process().authkey
+
+    with Client(tuple(address), authkey=authkey) as conn:
+        conn.send((op, payload))
+        status, response = conn.recv()
+
+    if status != 'ok':
+        raise RuntimeError(f"Worker {worker_id(address)} failed on '{op}': {response}")
+    return response
+
+
+def _broadcast(worker_addresses, op, payloads, authkey=None):
+    """
+    Sends a request to every worker in parallel.
+
+    Args:
+        worker_addresses (list): List of (host, port) worker addresses.
+        op (str): The worker operation.
+        payloads (list): One payload per worker.
+        authkey (bytes): Key used to authenticate with the workers.
+
+    Returns:
+        list: The responses, in the order of worker_addresses.
+    """
+    if not worker_addresses:
+        return []
+
+    with ThreadPoolExecutor(max_workers=len(worker_addresses)) as executor:
+        futures = [
+            executor.submit(_request, address, op, payload, authkey)
+            for address, payload in zip(worker_addresses, payloads)
+        ]
+        return [future.result() for future in futures]
+
+
+def start_local_workers(num_workers):
+    """
+    Starts workers as local processes listening on free localhost ports.
+
+    The workers inherit this process's authkey, so the coordinator functions
+    can reach them with the default authkey.
+
+    Args:
+        num_workers (int): Number of workers to start.
+
+    Returns:
+        list: The worker processes.
+        list: The (host, port) addresses of the workers.
+    """
+    processes = []
+    worker_addresses = []
+    for _ in range(num_workers):
+        parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=run_worker,
+            kwargs={'address': ('localhost', 0), 'ready': child_conn},
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker_addresses.append(tuple(parent_conn.recv()))
+        parent_conn.close()
+        processes.append(process)
+
+    return processes, worker_addresses
+
+
+def stop_workers(worker_addresses, authkey=None):
+    """
+    Asks every worker to shut down.
+
+    Shutdown is best effort: a worker that cannot be reached, for example
+    because it has already died, is skipped, so cleaning up after a failure
+    does not replace the original error.
+
+    Args:
+        worker_addresses (list): List of (host, port) worker addresses.
+        authkey (bytes): Key used to authenticate with the workers.
+
+    Returns:
+        list: The addresses of the workers that could not be reached.
+    """
+    unreachable = []
+    for address in worker_addresses:
+        try:
+            _request(address, 'shutdown', None, authkey)
+        except (OSError, EOFError, RuntimeError, multiprocessing.AuthenticationError):
+            unreachable.append(tuple(address))
+    return unreachable
+
+
+def join_workers(processes, timeout=10):
+    """
+    Waits for local worker processes to exit, terminating any that are still running after the timeout.
+
+    Args:
+        processes (list): The worker processes from start_local_workers.
+        timeout (float): Seconds to wait for each process before terminating it.
+
+    Returns:
+        None
+    """
+    for process in processes:
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+
+
+def distribute_encrypted_embeddings(worker_addresses, encrypted_data_path='data/encrypted_vectors.bin', context_public_path='data/context_public.bin', authkey=None, batch_size=64):
+    """
+    Loads the public context and a shard of the encrypted store onto each worker.
+
+    The embeddings are shipped in their serialized form and only deserialized
+    by the worker that owns them. They are streamed in batches of batch_size
+    consecutive words, each read from the store only when it is sent, split by
+    owner and sent to one worker at a time, so the coordinator holds a single
+    batch of the store at once.
+
+    Args:
+        worker_addresses (list): List of (host, port) worker addresses.
+        encrypted_data_path (str): Path to the encrypted embeddings file.
+        context_public_path (str): Path to the public context file.
+        authkey (bytes): Key used to authenticate with the workers.
+        batch_size (int): The number of words read from the store per batch.
+
+    Returns:
+        dict: A dictionary mapping each worker address to the number of words it holds.
+    """
+    with open(context_public_path, 'rb') as f:
+        context_public = f.read()
+
+    # One worker at a time, so only one pickled copy of the (large) context exists at once
+    for address in worker_addresses:
+        _request(address, 'load_context', context_public, authkey)
+    context_public = None
+
+    counts = {tuple(address): 0 for address in worker_addresses}
+    for batch in iter_encrypted_embeddings_bytes(encrypted_data_path, batch_size):
+        for address, ids in assign_shards(batch, worker_addresses).items():
+            if ids:
+                counts[address] = _request(address, 'put', {word_id: batch[word_id] for word_id in ids}, authkey)
+        batch = None
+
+    return counts
+
+
+def scatter_gather_query(worker_addresses, encrypted_query_path='data/encrypted_query.bin', results_path='data/encrypted_results.bin', authkey=None, vocabulary_fingerprint=None, store_fingerprint=None):
+    """
+    Fans the encrypted query out to every shard and merges the encrypted results.
+
+    The merged results are saved in the same format as save_encrypted_results,
+    so they can be decrypted with load_encrypted_results.
+
+    Args:
+        worker_addresses (list): List of (host, port) worker addresses.
+        encrypted_query_path (str): Path to the encrypted query file.
+        results_path (str): Path to save the merged encrypted results.
+        authkey (bytes): Key used to authenticate with the workers.
+        vocabulary_fingerprint (str, optional): Fingerprint of the vocabulary the word IDs refer to.
+        store_fingerprint (str, optional): Fingerprint of the encrypted store the shards were loaded from.
+
+    Returns:
+        int: The number of encrypted results gathered.
+    """
+    with open(encrypted_query_path, 'rb') as f:
+        encrypted_query_data = pickle.load(f)
+
+    shard_results = _broadcast(worker_addresses, 'query', [encrypted_query_data] * len(worker_addresses), authkey)
+
+    # Shards are disjoint, so merging is a plain union
+    encrypted_results_bytes = {}
+    for results in shard_results:
+        encrypted_results_bytes.update(results)
+    encrypted_results_bytes = dict(sorted(encrypted_results_bytes.items()))
+
+    print(f"Gathered encrypted results from {len(worker_addresses)} shards")
+    save_encrypted_results_bytes(encrypted_results_bytes, results_path, vocabulary_fingerprint, store_fingerprint)
+    return len(encrypted_results_bytes)
+
+
+def add_worker(worker_addresses, new_address, context_public_path='data/context_public.bin', authkey=None):
+    """
+    Adds a worker and moves the words it now owns from the existing shards.
+
+    Args:
+        worker_addresses (list): List of (host, port) addresses of the current workers.
+        new_address (tuple): The (host, port) address of the worker to add.
+        context_public_path (str): Path to the public context file.
+        authkey (bytes): Key used to authenticate with the workers.
+
+    Returns:
+        list: The updated list of worker addresses.
+    """
+    new_address = tuple(new_address)
+    updated_addresses = [tuple(address) for address in worker_addresses] + [new_address]
+
+    with open(context_public_path, 'rb') as f:
+        _request(new_address, 'load_context', f.read(), authkey)
+
+    shard_ids = _broadcast(worker_addresses, 'ids', [None] * len(worker_addresses), authkey)
+    moving = [
+        [word_id for word_id in ids if shard_owner(word_id, updated_addresses) == new_address]
+        for ids in shard_ids
+    ]
+
+    # Copy each moving slice before dropping it, so a failed transfer loses nothing
+    for address, ids in zip(worker_addresses, moving):
+        if ids:
+            _request(new_address, 'put', _request(address, 'get', ids, authkey), authkey)
+            _request(address, 'drop', ids, authkey)
+
+    return updated_addresses
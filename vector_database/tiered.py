@@ -0,0 +1,274 @@
+# vector_database/tiered.py
+
+import os
+import numpy as np
+
+from vector_database.computation import (
+    load_encrypted_embeddings,
+    load_encrypted_store_header,
+    load_encrypted_query,
+    compute_encrypted_cosine_similarities,
+    save_encrypted_results,
+    SCHEDULE_AUTO,
+)
+from vector_database.display import load_encrypted_results, decrypt_results, top_k
+from vector_database.encryption import create_contexts, encrypt_embeddings, encrypt_query
+
+
+# The coarse tier scores unit-length vectors by dot product alone, so it only
+# needs multiplicative depth one and fits in a much smaller ring.
+COARSE_POLY_MODULUS_DEGREE = 8192
+COARSE_COEFF_MOD_BIT_SIZES = [60, 40, 60]
+DEFAULT_COARSE_DIMENSIONS = 64
+DEFAULT_NUM_CANDIDATES = 300
+
+
+def fit_coarse_projection(embeddings, coarse_dimensions=DEFAULT_COARSE_DIMENSIONS):
+    """
+    Fits a projection onto the leading principal directions of the unit-length embeddings.
+
+    The directions come from an uncentered SVD, which keeps the subspace that
+    best preserves dot products between unit vectors.
+
+    Args:
+        embeddings (dict): Dictionary of word embeddings.
+        coarse_dimensions (int, optional): Number of dimensions to keep. Keeps all dimensions if None.
+
+    Returns:
+        numpy.array: The (dimensions, coarse_dimensions) projection matrix, or None if no reduction is needed.
+    """
+    matrix = np.array(list(embeddings.values()), dtype=np.float64)
+    if coarse_dimensions is None or coarse_dimensions >= matrix.shape[1]:
+        return None
+
+    unit_matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    _, _, components = np.linalg.svd(unit_matrix, full_matrices=False)
+    return components[:coarse_dimensions].T
+
+
+def project_embeddings(embeddings, projection):
+    """
+    Projects word embeddings into the coarse tier's reduced space.
+
+    Args:
+        embeddings (dict): Dictionary of word embeddings.
+        projection (numpy.array): The projection matrix, or None to keep the embeddings as they are.
+
+    Returns:
+        dict: A dictionary mapping words to their projected vectors.
+    """
+    if projection is None:
+        return embeddings
+    return {word: np.asarray(vector, dtype=np.float64) @ projection for word, vector in embeddings.items()}
+
+
+def _coarse_paths(coarse_dir):
+    """
+    Returns the file paths of the coarse tier, which mirror the full tier's layout.
+    """
+    return {
+        'context_public': os.path.join(coarse_dir, 'context_public.bin'),
+        'context_private': os.path.join(coarse_dir, 'context_private.bin'),
+        'encrypted_data': os.path.join(coarse_dir, 'encrypted_vectors.bin'),
+        'encrypted_query': os.path.join(coarse_dir, 'encrypted_query.bin'),
+        'encrypted_results': os.path.join(coarse_dir, 'encrypted_results.bin'),
+        'projection': os.path.join(coarse_dir, 'projection.npy'),
+    }
+
+
+def create_coarse_tier(embeddings, coarse_dir='data/coarse', coarse_dimensions=DEFAULT_COARSE_DIMENSIONS, poly_modulus_degree=COARSE_POLY_MODULUS_DEGREE, coeff_mod_bit_sizes=None):
+    """
+    Creates the coarse tier next to the full-precision store built by encrypt_embeddings.
+
+    The coarse tier has its own small, low-precision context. Its store holds
+    the embeddings projected to fewer dimensions and normalized to unit length,
+    so each word is scored with a single multiplication. Both tiers share the
+    vocabulary saved with the full-precision store, so a word has the same ID in each.
+
+    Args:
+        embeddings (dict): Dictionary of word embeddings.
+        coarse_dir (str): Directory for the coarse tier's contexts, store and projection.
+        coarse_dimensions (int, optional): Number of dimensions to keep. Keeps all dimensions if None.
+        poly_modulus_degree (int): The degree of the polynomial modulus of the coarse context.
+        coeff_mod_bit_sizes (list, optional): List of coefficient modulus sizes of the coarse context.
+
+    Returns:
+        None
+    """
+    if coeff_mod_bit_sizes is None:
+        coeff_mod_bit_sizes = COARSE_COEFF_MOD_BIT_SIZES
+
+    paths = _coarse_paths(coarse_dir)
+    create_contexts(
+        poly_modulus_degree=poly_modulus_degree,
+        coeff_mod_bit_sizes=coeff_mod_bit_sizes,
+        context_dir=coarse_dir,
+    )
+
+    # The projection is derived from the plaintext embeddings, so it stays with the data owner
+    projection = fit_coarse_projection(embeddings, coarse_dimensions)
+    if projection is not None:
+        np.save(paths['projection'], projection)
+    elif os.path.exists(paths['projection']):
+        os.remove(paths['projection'])
+
+    encrypt_embeddings(
+        project_embeddings(embeddings, projection),
+        context_public_path=paths['context_public'],
+        encrypted_data_path=paths['encrypted_data'],
+        unit_norm=True,
+        vocabulary_path=None,
+    )
+
+
+def load_coarse_projection(coarse_dir='data/coarse'):
+    """
+    Loads the coarse tier's projection matrix.
+
+    Args:
+        coarse_dir (str): Directory of the coarse tier.
+
+    Returns:
+        numpy.array: The projection matrix, or None if the coarse tier keeps all dimensions.
+    """
+    projection_path = _coarse_paths(coarse_dir)['projection']
+    if not os.path.exists(projection_path):
+        return None
+    return np.load(projection_path)
+
+
+def encrypt_coarse_query(query_word, embeddings, coarse_dir='data/coarse'):
+    """
+    Encrypts the query for the coarse tier and saves it to the coarse directory.
+
+    Args:
+        query_word (str): The query word to encrypt.
+        embeddings (dict): Dictionary of word embeddings.
+        coarse_dir (str): Directory of the coarse tier.
+
+    Returns:
+        None
+    """
+    if query_word not in embeddings:
+        raise ValueError(f"Query word '{query_word}' not found in embeddings.")
+
+    paths = _coarse_paths(coarse_dir)
+    projected_query = project_embeddings({query_word: embeddings[query_word]}, load_coarse_projection(coarse_dir))
+    encrypt_query(
+        query_word,
+        projected_query,
+        context_public_path=paths['context_public'],
+        encrypted_query_path=paths['encrypted_query'],
+        unit_norm=True,
+    )
+
+
+def coarse_scan(coarse_dir='data/coarse'):
+    """
+    Scores the whole vocabulary against the encrypted query with the coarse tier.
+
+    Runs on the compute server with the coarse public context only.
+
+    Args:
+        coarse_dir (str): Directory of the coarse tier.
+
+    Returns:
+        None
+    """
+    paths = _coarse_paths(coarse_dir)
+    encrypted_embeddings, _ = load_encrypted_embeddings(paths['encrypted_data'], paths['context_public'])
+    encrypted_query_vector, encrypted_query_inv_norm = load_encrypted_query(paths['encrypted_query'], paths['context_public'])
+
+    encrypted_results = compute_encrypted_cosine_similarities(
+        encrypted_query_vector, encrypted_query_inv_norm, encrypted_embeddings
+    )
+    save_encrypted_results(
+        encrypted_results,
+        results_path=paths['encrypted_results'],
+        vocabulary_fingerprint=load_encrypted_store_header(paths['encrypted_data'])['vocabulary_fingerprint'],
+    )
+
+
+def select_candidates(coarse_dir='data/coarse', num_candidates=DEFAULT_NUM_CANDIDATES):
+    """
+    Decrypts the coarse scores and picks the candidates to rerank.
+
+    Runs on the client with the coarse private context. Note that sending the
+    candidate list back to the server reveals which words scored highest.
+
+    Args:
+        coarse_dir (str): Directory of the coarse tier.
+        num_candidates (int): Number of candidates to keep.
+
+    Returns:
+        list: The IDs of the candidate words, highest coarse score first.
+    """
+    paths = _coarse_paths(coarse_dir)
+    encrypted_results, _ = load_encrypted_results(paths['encrypted_results'], paths['context_private'])
+    return top_k(decrypt_results(encrypted_results), num_candidates)
+
+
+def check_tier_vocabularies(coarse_dir='data/coarse', encrypted_data_path='data/encrypted_vectors.bin'):
+    """
+    Checks that the coarse and full-precision stores were built from the same vocabulary.
+
+    The coarse tier saves no vocabulary of its own and its candidates are word
+    IDs, so they only name the right words in the full-precision store if both
+    stores carry the same vocabulary fingerprint.
+
+    Args:
+        coarse_dir (str): Directory of the coarse tier.
+        encrypted_data_path (str): Path to the full-precision encrypted embeddings file.
+
+    Returns:
+        str: The shared vocabulary fingerprint.
+
+    Raises:
+        ValueError: If the stores were built from different vocabularies.
+    """
+    coarse_fingerprint = load_encrypted_store_header(_coarse_paths(coarse_dir)['encrypted_data'])['vocabulary_fingerprint']
+    full_fingerprint = load_encrypted_store_header(encrypted_data_path)['vocabulary_fingerprint']
+    if coarse_fingerprint != full_fingerprint:
+        raise ValueError(
+            f"The coarse tier's vocabulary ({coarse_fingerprint}) does not match the full-precision store's "
+            f"({full_fingerprint}). Rebuild the coarse tier from the same embeddings."
+        )
+    return full_fingerprint
+
+
+def rerank_candidates(candidates, encrypted_data_path='data/encrypted_vectors.bin', encrypted_query_path='data/encrypted_query.bin', context_public_path='data/context_public.bin', results_path='data/encrypted_results.bin', schedule=SCHEDULE_AUTO, coarse_dir='data/coarse'):
+    """
+    Rescores only the candidate words with the full-precision store.
+
+    Runs on the compute server. Only the candidates' records are read from the
+    store, deserialized and scored, and the results are saved in the same
+    format as a full scan.
+
+    Args:
+        candidates (list): The IDs of the candidate words from select_candidates.
+        encrypted_data_path (str): Path to the full-precision encrypted embeddings file.
+        encrypted_query_path (str): Path to the full-precision encrypted query file.
+        context_public_path (str): Path to the full-precision public context file.
+        results_path (str): Path to save the encrypted results.
+        schedule (str): Kernel mode passed to compute_encrypted_cosine_similarities.
+        coarse_dir (str): Directory of the coarse tier the candidates were selected with.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the coarse tier and the full-precision store were built from different vocabularies.
+    """
+    vocabulary_fingerprint = check_tier_vocabularies(coarse_dir, encrypted_data_path)
+
+    encrypted_embeddings, _ = load_encrypted_embeddings(encrypted_data_path, context_public_path, ids=candidates)
+    encrypted_query_vector, encrypted_query_inv_norm = load_encrypted_query(encrypted_query_path, context_public_path)
+
+    encrypted_results = compute_encrypted_cosine_similarities(
+        encrypted_query_vector, encrypted_query_inv_norm, encrypted_embeddings, schedule=schedule
+    )
+    save_encrypted_results(
+        encrypted_results,
+        results_path=results_path,
+        vocabulary_fingerprint=vocabulary_fingerprint,
+    )
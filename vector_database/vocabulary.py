@@ -0,0 +1,113 @@
+# vector_database/vocabulary.py
+
+import hashlib
+import os
+import numpy as np
+
+
+def build_vocabulary(words):
+    """
+    Builds the vocabulary index: the unique words as a sorted array.
+
+    A word's integer ID is its position in the array, so IDs are contiguous
+    and every other file can refer to words by ID instead of repeating them.
+
+    Args:
+        words (iterable): The words to index.
+
+    Returns:
+        numpy.array: The sorted array of unique words.
+    """
+    return np.unique(np.array(list(words), dtype=str))
+
+
+def word_ids(vocabulary, words):
+    """
+    Looks up the integer IDs of words by binary search.
+
+    Args:
+        vocabulary (numpy.array): The sorted array of words.
+        words (iterable): The words to look up.
+
+    Returns:
+        numpy.array: The integer IDs, in the order of words.
+
+    Raises:
+        KeyError: If a word is not in the vocabulary.
+    """
+    words = np.array(list(words), dtype=str)
+    ids = np.searchsorted(vocabulary, words)
+    found = ids < len(vocabulary)
+    found[found] = vocabulary[ids[found]] == words[found]
+    if not found.all():
+        raise KeyError(f"Words not found in vocabulary: {list(words[~found][:5])}")
+    return ids
+
+
+def word_id(vocabulary, word):
+    """
+    Looks up the integer ID of one word.
+
+    Args:
+        vocabulary (numpy.array): The sorted array of words.
+        word (str): The word to look up.
+
+    Returns:
+        int: The integer ID of the word.
+
+    Raises:
+        KeyError: If the word is not in the vocabulary.
+    """
+    return int(word_ids(vocabulary, [word])[0])
+
+
+def vocabulary_fingerprint(vocabulary):
+    """
+    Computes a short fingerprint of the vocabulary.
+
+    Files addressed by integer IDs store it, so they can be checked against
+    the vocabulary used to decode them.
+
+    Args:
+        vocabulary (numpy.array): The sorted array of words.
+
+    Returns:
+        str: The hexadecimal fingerprint.
+    """
+    return hashlib.sha256('\n'.join(vocabulary.tolist()).encode('utf-8')).hexdigest()[:16]
+
+
+def save_vocabulary(vocabulary, vocabulary_path='data/vocabulary.txt'):
+    """
+    Saves the vocabulary to a text file, one word per line in ID order.
+
+    Args:
+        vocabulary (numpy.array): The sorted array of words.
+        vocabulary_path (str): Path to save the vocabulary.
+
+    Returns:
+        None
+    """
+    vocabulary_dir = os.path.dirname(vocabulary_path)
+    if vocabulary_dir:
+        os.makedirs(vocabulary_dir, exist_ok=True)
+
+    with open(vocabulary_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(vocabulary.tolist()))
+
+    print(f"Vocabulary of {len(vocabulary)} words saved to {vocabulary_path}")
+
+
+def load_vocabulary(vocabulary_path='data/vocabulary.txt'):
+    """
+    Loads the vocabulary from a text file.
+
+    Args:
+        vocabulary_path (str): Path to the vocabulary file.
+
+    Returns:
+        numpy.array: The sorted array of words.
+    """
+    with open(vocabulary_path, 'r', encoding='utf-8') as f:
+        words = f.read().splitlines()
+    return np.array(words, dtype=str)